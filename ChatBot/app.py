@@ -1,8 +1,23 @@
+import os
+import sys
+
 from flask import Flask, request, jsonify, render_template
 from openai import OpenAI
 
+# response_cache.py lives at the repository root (shared with Flask/APImodel.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache, cache_headers
+
 app = Flask(__name__)
 
+MODEL = "moonshotai/Kimi-K2-Thinking:novita"
+SAMPLING = {}  # provider defaults (not deterministic: cached only with RESPONSE_CACHE=on)
+
+# Opt-in reply cache for repeated prompts (RESPONSE_CACHE=deterministic|on)
+reply_cache = ResponseCache.from_env()
+reply_cache.warn_if_unused(SAMPLING, app.logger)
+
 # Get Hugging Face API token from environment
 HF_TOKEN = 'Token value'
 
@@ -27,16 +42,36 @@ def generate():
     data = request.get_json()
     user_input = data.get("prompt", "")
 
+    messages = [{"role": "user", "content": user_input}]
+
+    use_cache = reply_cache.applies(SAMPLING)
+    key = reply_cache.make_key(MODEL, messages, SAMPLING)
+    if use_cache:
+        hit = reply_cache.lookup(key)
+        if hit:
+            return jsonify({"response": hit[0]}), 200, cache_headers(hit)
+    else:
+        reply_cache.bypass()
+
     try:
         completion = client.chat.completions.create(
-            model="moonshotai/Kimi-K2-Thinking:novita",
-            messages=[{"role": "user", "content": user_input}],
+            model=MODEL,
+            messages=messages,
+            **SAMPLING,
         )
         response = completion.choices[0].message.content
-        return jsonify({"response": response})
+        if use_cache:
+            reply_cache.store(key, response)
+            return jsonify({"response": response}), 200, cache_headers(None)
+        return jsonify({"response": response}), 200, {"X-Cache": "BYPASS"}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/cache/stats")
+def cache_stats():
+    return jsonify(reply_cache.snapshot())
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -1,15 +1,94 @@
+"""
+ColourChat: a small chat UI in front of the OpenAI Chat Completions API.
+
+Runs as an ASGI app (Quart, Flask's async twin) so a slow completion only
+suspends its own coroutine instead of tying up a worker. One AsyncOpenAI
+client with a pooled HTTP connection is shared by all requests; timeouts
+and retries (exponential backoff with jitter) come from the environment.
+
+    python APImodel.py [--port 5000]         # hypercorn, no debug mode
+    uvicorn APImodel:app --port 5000         # or any ASGI server
+
+Env: OPENAI_API_KEY (required), OPENAI_BASE_URL (e.g. the mock server in
+mock_openai.py), OPENAI_MODEL, OPENAI_TIMEOUT, OPENAI_CONNECT_TIMEOUT,
+OPENAI_MAX_RETRIES, OPENAI_RETRY_DELAY, OPENAI_MAX_CONNECTIONS (upstream
+calls in flight), OPENAI_POOL_SIZE (connections per client pool).
+
+POST /api/chat returns the whole reply as JSON; POST /api/chat/stream
+streams it as server-sent events (used by the page) and logs the
+first-byte latency of every request.
+
+Identical requests can be answered from an opt-in reply cache
+(RESPONSE_CACHE=deterministic|on, see response_cache.py); responses carry
+an X-Cache header and GET /api/cache/stats reports hit counts. Replies are
+sampled at temperature 0.8, so only RESPONSE_CACHE=on caches them.
+
+Chats are multi-turn: a cookie identifies a server-side session whose
+history is kept under a token budget by summarizing (SESSION_SUMMARIZE=1,
+default) or dropping the oldest turns; see chat_sessions.py.
+"""
+
 import os
-from flask import Flask, request, jsonify, render_template_string
-import openai
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import itertools
+
+import httpx
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError
+from quart import Quart, request, jsonify, make_response, render_template_string
+
+# response_cache.py lives at the repository root (shared with ChatBot/app.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_sessions import SessionStore, count_tokens
+from response_cache import ResponseCache, cache_headers
 
 # Load API key from environment
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise RuntimeError("Please set the OPENAI_API_KEY environment variable.")
 
-openai.api_key = OPENAI_API_KEY
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None = api.openai.com
+MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+
+# Timeouts (seconds), retries and connection pool size
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+RETRY_DELAY = float(os.getenv("OPENAI_RETRY_DELAY", "0.5"))
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "300"))
+POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "10"))  # connections per client pool
+
+# Worth retrying: timeouts, rate limits and transient server errors
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
 
-app = Flask(__name__)
+# Sampling settings shared by both chat endpoints (temperature > 0: not
+# "deterministic" for the reply cache)
+SAMPLING = {"max_tokens": 400, "temperature": 0.8, "top_p": 0.9}
+SYSTEM_PROMPT = "You are a helpful assistant that replies concisely and politely."
+
+app = Quart(__name__)
+app.logger.setLevel(logging.INFO)
+
+# Created on the server's event loop (see open_client)
+clients = []
+_next_client = itertools.count()
+# One slot per pooled connection: requests beyond the pool wait here, which
+# is cheap, instead of queueing inside httpcore's pool
+upstream_slots = asyncio.Semaphore(MAX_CONNECTIONS)
+
+reply_cache = ResponseCache.from_env()
+reply_cache.warn_if_unused(SAMPLING, app.logger)
+
+# Conversation sessions (see chat_sessions.py)
+SESSION_COOKIE = "colourchat_session"
+SESSION_SUMMARIZE = os.getenv("SESSION_SUMMARIZE", "1") == "1"
+PROMPT_TOKEN_LIMIT = int(os.getenv("PROMPT_TOKEN_LIMIT", "1000"))
+sessions = SessionStore.from_env()
 
 # A colorful, playful HTML + CSS UI delivered from Flask.
 HTML = """
@@ -84,7 +163,7 @@ HTML = """
         <p class="lead">Type anything. Press Send. Powered by ChatGPT (OpenAI).</p>
       </div>
       <div class="meta">
-        <div class="chip">Model: gpt-3.5-turbo</div>
+        <div class="chip">Model: {{ model }}</div>
       </div>
     </header>
 
@@ -92,6 +171,7 @@ HTML = """
       <textarea id="prompt" class="prompt" placeholder="Ask something creative, technical, or just fun...">Hello ChatGPT — give me a friendly tip about clean code.</textarea>
       <div style="display:flex;gap:12px;align-items:center;margin-top:8px">
         <button id="send" class="sendBtn">Send →</button>
+        <button id="reset" class="chip" style="border:none;cursor:pointer">New chat</button>
         <div style="font-size:13px;color:#555">Responses appear below. Keep prompts concise for faster replies.</div>
       </div>
     </section>
@@ -117,6 +197,34 @@ HTML = """
       d.innerText = text;
       conv.appendChild(d);
       conv.scrollTop = conv.scrollHeight;
+      return d;
+    }
+
+    // Read a server-sent event stream from a fetch() response.
+    // Calls onDelta(text) for each chunk and throws on an "error" event.
+    async function readEvents(resp, onDelta){
+      const reader = resp.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while(true){
+        const {value, done} = await reader.read();
+        if(done) return;
+        buffer += decoder.decode(value, {stream: true});
+        let sep;
+        while((sep = buffer.indexOf('\\n\\n')) !== -1){
+          const raw = buffer.slice(0, sep);
+          buffer = buffer.slice(sep + 2);
+          let event = 'message', data = '';
+          for(const line of raw.split('\\n')){
+            if(line.startsWith('event: ')) event = line.slice(7);
+            else if(line.startsWith('data: ')) data += line.slice(6);
+          }
+          if(data === '[DONE]') return;
+          const payload = JSON.parse(data);
+          if(event === 'error') throw new Error(payload.error);
+          onDelta(payload.delta);
+        }
+      }
     }
 
     async function sendPrompt(){
@@ -127,7 +235,7 @@ HTML = """
       sendBtn.innerText = 'Thinking...';
 
       try{
-        const resp = await fetch('/api/chat', {
+        const resp = await fetch('/api/chat/stream', {
           method: 'POST',
           headers: {'Content-Type':'application/json'},
           body: JSON.stringify({prompt})
@@ -136,8 +244,17 @@ HTML = """
           const txt = await resp.text();
           appendMessage('Error: ' + txt, 'assistant');
         } else {
-          const data = await resp.json();
-          appendMessage(data.reply, 'assistant');
+          // Render the reply as it arrives
+          const msg = appendMessage('', 'assistant');
+          sendBtn.innerText = 'Replying...';
+          try{
+            await readEvents(resp, (delta) => {
+              msg.innerText += delta;
+              conv.scrollTop = conv.scrollHeight;
+            });
+          } catch(err){
+            msg.innerText += (msg.innerText ? '\\n' : '') + 'Error: ' + err.message;
+          }
         }
       } catch(err){
         appendMessage('Network error: ' + err.message, 'assistant');
@@ -148,6 +265,10 @@ HTML = """
     }
 
     sendBtn.addEventListener('click', sendPrompt);
+    document.getElementById('reset').addEventListener('click', async () => {
+      await fetch('/api/chat/reset', {method: 'POST'});
+      conv.innerHTML = '';
+    });
     promptEl.addEventListener('keydown', (e) => {
       if(e.key === 'Enter' && (e.ctrlKey || e.metaKey)) sendPrompt();
     });
@@ -156,42 +277,244 @@ HTML = """
 </html>
 """
 
+@app.before_serving
+async def open_client():
+    """
+    Clients + connection pools for the whole process: MAX_CONNECTIONS split
+    into pools of POOL_SIZE. httpcore's pool bookkeeping is quadratic in its
+    connection count, so several small pools cost far less CPU than one big one.
+    """
+    timeout = httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+    for start in range(0, MAX_CONNECTIONS, POOL_SIZE):
+        size = min(POOL_SIZE, MAX_CONNECTIONS - start)
+        clients.append(AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL,
+            timeout=timeout,
+            max_retries=0,  # retries are done by create_completion (with jitter)
+            http_client=httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+            ),
+        ))
+
+
+@app.after_serving
+async def close_client():
+    for client in clients:
+        await client.close()
+    clients.clear()
+
+
+async def create_completion(**kwargs):
+    """
+    chat.completions.create with exponential backoff + jitter on transient
+    errors. Callers hold an upstream_slots slot around the call (and around
+    consuming a stream).
+    """
+    delay = RETRY_DELAY
+    for attempt in range(1, MAX_RETRIES + 2):
+        try:
+            client = clients[next(_next_client) % len(clients)]
+            return await client.chat.completions.create(**kwargs)
+        except APIConnectionError as e:  # includes timeouts
+            error = e
+        except APIStatusError as e:
+            if e.status_code not in RETRYABLE_STATUS:
+                raise
+            error = e
+
+        if attempt > MAX_RETRIES:
+            raise error
+        sleep_for = delay + random.uniform(0, delay)
+        app.logger.warning("OpenAI attempt %d failed (%s); retrying in %.2fs", attempt, error, sleep_for)
+        await asyncio.sleep(sleep_for)
+        delay *= 2
+
+
+async def summarize(text):
+    """Condense older turns into a short summary (keeps the session under budget)."""
+    async with upstream_slots:
+        resp = await create_completion(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": "Summarize this conversation in a few sentences. "
+                                              "Keep names, facts, decisions and open questions."},
+                {"role": "user", "content": text},
+            ],
+            max_tokens=sessions.summary_budget,
+            temperature=0,
+        )
+    return resp.choices[0].message.content.strip()
+
+
+async def open_session(prompt):
+    """
+    Validate the prompt and load the caller's session.
+    Returns (error_response, None, None, None) or (None, session_id, session, messages).
+    """
+    if count_tokens(prompt) > PROMPT_TOKEN_LIMIT:
+        error = jsonify({"error": f"Prompt too long (limit {PROMPT_TOKEN_LIMIT} tokens)."}), 413
+        return error, None, None, None
+    session_id, session = sessions.get_or_create(request.cookies.get(SESSION_COOKIE))
+    # Snapshot under the lock so a turn still being folded/summarized is seen whole
+    async with session.lock:
+        messages = session.messages(SYSTEM_PROMPT, prompt)
+    return None, session_id, session, messages
+
+
+def remember_turn(session, prompt, reply):
+    """
+    Record the exchange in a background task: it outlives a client that
+    disconnects, and summarizing doesn't hold the response open.
+    """
+    app.add_background_task(
+        sessions.add_turn, session, prompt, reply, summarize if SESSION_SUMMARIZE else None
+    )
+
+
+def set_session_cookie(response, session_id):
+    response.set_cookie(SESSION_COOKIE, session_id, max_age=int(sessions.idle_ttl),
+                        httponly=True, samesite="Lax")
+    return response
+
+
+def sse(payload, event=None):
+    """One server-sent event carrying a JSON payload."""
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(payload)}\n\n"
+
+
 @app.route("/")
-def home():
-    return render_template_string(HTML)
+async def home():
+    return await render_template_string(HTML, model=MODEL)
 
 @app.route("/api/chat", methods=["POST"])
-def chat_api():
-    data = request.get_json()
+async def chat_api():
+    data = await request.get_json()
     if not data or "prompt" not in data:
         return jsonify({"error": "No prompt provided."}), 400
 
     prompt = data["prompt"]
 
-    # Build messages for Chat API
-    messages = [
-        {"role": "system", "content": "You are a helpful assistant that replies concisely and politely."},
-        {"role": "user", "content": prompt}
-    ]
-
-    try:
-        # Use Chat Completions API
-        resp = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            max_tokens=400,
-            temperature=0.8,
-            top_p=0.9
-        )
+    # Build messages for Chat API: system, session summary + recent turns, prompt
+    error, session_id, session, messages = await open_session(prompt)
+    if error:
+        return error
 
-        # Extract assistant text
-        reply = resp["choices"][0]["message"]["content"].strip()
-        return jsonify({"reply": reply})
+    # Serve repeated prompts from the cache (only when enabled, see response_cache.py)
+    use_cache = reply_cache.applies(SAMPLING)
+    key = reply_cache.make_key(MODEL, messages, SAMPLING)
+    hit = reply_cache.lookup(key) if use_cache else None
+    if not use_cache:
+        reply_cache.bypass()
 
-    except Exception as e:
-        # Log error server-side (in production, use proper logging)
-        print("OpenAI error:", e)
-        return jsonify({"error": "AI service error: " + str(e)}), 500
+    if hit:
+        reply = hit[0]
+    else:
+        try:
+            # Use Chat Completions API
+            async with upstream_slots:
+                resp = await create_completion(model=MODEL, messages=messages, **SAMPLING)
+
+            # Extract assistant text
+            reply = resp.choices[0].message.content.strip()
+        except Exception as e:
+            app.logger.error("OpenAI error: %s", e)
+            return jsonify({"error": "AI service error: " + str(e)}), 500
+        if use_cache:
+            reply_cache.store(key, reply)
+
+    remember_turn(session, prompt, reply)
+    response = jsonify({"reply": reply})
+    response.headers.update(cache_headers(hit) if use_cache else {"X-Cache": "BYPASS"})
+    return set_session_cookie(response, session_id)
+
+@app.route("/api/chat/stream", methods=["POST"])
+async def chat_stream():
+    """Like /api/chat, but streams the reply as SSE `data: {"delta": ...}` events."""
+    started = time.perf_counter()
+    data = await request.get_json()
+    if not data or "prompt" not in data:
+        return jsonify({"error": "No prompt provided."}), 400
+
+    prompt = data["prompt"]
+    error, session_id, session, messages = await open_session(prompt)
+    if error:
+        return error
+
+    use_cache = reply_cache.applies(SAMPLING)
+    key = reply_cache.make_key(MODEL, messages, SAMPLING)
+    hit = reply_cache.lookup(key) if use_cache else None
+    if not use_cache:
+        reply_cache.bypass()
+
+    async def events():
+        first_byte_ms = None
+        try:
+            if hit:
+                # Cached reply: send it as a single delta
+                first_byte_ms = (time.perf_counter() - started) * 1000
+                yield sse({"delta": hit[0]})
+                remember_turn(session, prompt, hit[0])
+                yield "data: [DONE]\n\n"
+                return
+
+            parts = []
+            async with upstream_slots:  # the connection is busy until the stream ends
+                stream = await create_completion(model=MODEL, messages=messages, stream=True, **SAMPLING)
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    if first_byte_ms is None:
+                        first_byte_ms = (time.perf_counter() - started) * 1000
+                    parts.append(delta)
+                    yield sse({"delta": delta})
+            reply = "".join(parts).strip()
+            if use_cache:
+                reply_cache.store(key, reply)
+            remember_turn(session, prompt, reply)
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            app.logger.error("OpenAI error: %s", e)
+            yield sse({"error": "AI service error: " + str(e)}, event="error")
+        finally:
+            app.logger.info(
+                "chat stream: first byte %s ms, total %.0f ms",
+                "-" if first_byte_ms is None else f"{first_byte_ms:.0f}",
+                (time.perf_counter() - started) * 1000,
+            )
+
+    response = await make_response(events(), {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # don't let proxies buffer the stream
+        **(cache_headers(hit) if use_cache else {"X-Cache": "BYPASS"}),
+    })
+    response.timeout = None  # a long reply may stream past the default response timeout
+    return set_session_cookie(response, session_id)
+
+@app.route("/api/chat/reset", methods=["POST"])
+async def chat_reset():
+    """Forget the caller's conversation."""
+    sessions.drop(request.cookies.get(SESSION_COOKIE))
+    return jsonify({"ok": True})
+
+@app.route("/api/cache/stats")
+async def cache_stats():
+    return jsonify(reply_cache.snapshot())
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    import argparse
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    parser = argparse.ArgumentParser(description="ColourChat server (hypercorn)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+    config = Config()
+    config.bind = [f"{args.host}:{args.port}"]
+    # No debug mode: asyncio's debug checks slow every task down
+    asyncio.run(serve(app, config))
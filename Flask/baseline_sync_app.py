@@ -0,0 +1,61 @@
+"""
+Baseline for load_test.py: ColourChat's /api/chat as it was before the
+Quart rewrite -- a sync Flask view making one blocking completion per
+request, no retries, no connection pool tuning. It uses the openai>=1.0
+sync client (the original openai.ChatCompletion call no longer exists)
+so it runs against mock_openai.py today.
+
+    python mock_openai.py --latency 1.0 &
+    OPENAI_API_KEY=test OPENAI_BASE_URL=http://127.0.0.1:8001/v1 python baseline_sync_app.py &
+    python load_test.py --concurrency 50 --requests 200
+
+By default the server handles one request at a time, like a single sync
+worker (gunicorn -w 1). --threaded uses a thread per request instead
+(Flask's dev-server default), --port changes the port (default 5000).
+"""
+
+import os
+import argparse
+
+from flask import Flask, request, jsonify
+from openai import OpenAI
+
+MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    base_url=os.getenv("OPENAI_BASE_URL"),
+    max_retries=0,
+)
+
+app = Flask(__name__)
+
+
+@app.route("/api/chat", methods=["POST"])
+def chat_api():
+    data = request.get_json()
+    if not data or "prompt" not in data:
+        return jsonify({"error": "No prompt provided."}), 400
+
+    try:
+        resp = client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that replies concisely and politely."},
+                {"role": "user", "content": data["prompt"]},
+            ],
+            max_tokens=400,
+            temperature=0.8,
+            top_p=0.9,
+        )
+        return jsonify({"reply": resp.choices[0].message.content.strip()})
+    except Exception as e:
+        return jsonify({"error": "AI service error: " + str(e)}), 500
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync Flask ColourChat baseline for load tests")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--threaded", action="store_true", help="one thread per request instead of one at a time")
+    args = parser.parse_args()
+    app.run(port=args.port, threaded=args.threaded)
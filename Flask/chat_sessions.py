@@ -0,0 +1,151 @@
+"""
+Server-side conversation sessions for ColourChat.
+
+Each browser gets a random session id in a cookie; the server keeps that
+session's recent turns plus a running summary of older ones. Before a turn
+is sent upstream the history is held under a token budget: the oldest turns
+are folded into the summary (or simply dropped when no summarizer is
+given), so every request stays bounded no matter how long the chat runs.
+
+Sessions live in memory in an LRU of at most SESSION_MAX sessions and
+expire after SESSION_IDLE_TTL seconds without activity.
+"""
+
+import os
+import re
+import time
+import asyncio
+import secrets
+from collections import OrderedDict
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to an approximate count
+    tiktoken = None
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role + separators per chat message
+
+_encoding = None
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    """Token count with tiktoken's cl100k_base, or a word/punctuation estimate."""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    # ~1.3 tokens per word on English text
+    return int(len(_PIECE_RE.findall(text)) * 1.3) + 1
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ChatSession:
+    def __init__(self):
+        self.summary = ""
+        self.turns = []  # [{"role": ..., "content": ...}], oldest first
+        self.last_seen = time.time()
+        self.lock = asyncio.Lock()
+
+    def history_tokens(self):
+        summary = count_tokens(self.summary) + MESSAGE_OVERHEAD_TOKENS if self.summary else 0
+        return summary + sum(message_tokens(m) for m in self.turns)
+
+    def messages(self, system_prompt, prompt):
+        """Chat messages for the next request: system, summary, recent turns, prompt."""
+        messages = [{"role": "system", "content": system_prompt}]
+        if self.summary:
+            messages.append({"role": "system", "content": "Summary of the earlier conversation: " + self.summary})
+        messages.extend(self.turns)
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+
+class SessionStore:
+    def __init__(self, max_sessions=1000, idle_ttl=3600, history_budget=1500, summary_budget=200):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.history_budget = history_budget    # summary + turns, in tokens
+        self.summary_budget = summary_budget    # max tokens kept for the summary itself
+        self._sessions = OrderedDict()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_sessions=int(os.getenv("SESSION_MAX", "1000")),
+            idle_ttl=float(os.getenv("SESSION_IDLE_TTL", "3600")),
+            history_budget=int(os.getenv("SESSION_HISTORY_TOKENS", "1500")),
+            summary_budget=int(os.getenv("SESSION_SUMMARY_TOKENS", "200")),
+        )
+
+    def get_or_create(self, session_id):
+        """(session_id, session); unknown or expired ids get a fresh session."""
+        now = time.time()
+        self._expire(now)
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            session_id = secrets.token_urlsafe(24)
+            session = self._sessions[session_id] = ChatSession()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        session.last_seen = now
+        return session_id, session
+
+    def drop(self, session_id):
+        self._sessions.pop(session_id, None)
+
+    def _expire(self, now):
+        # Sessions are kept in last-seen order, so expired ones are at the front
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_seen < self.idle_ttl:
+                break
+            del self._sessions[oldest_id]
+
+    async def add_turn(self, session, prompt, reply, summarize=None):
+        """
+        Record a user/assistant exchange, then fold the oldest turns out until
+        the history fits history_budget. summarize(text) -> str (async) merges
+        them into the running summary; without it they are just dropped.
+        """
+        async with session.lock:
+            session.turns.append({"role": "user", "content": prompt})
+            session.turns.append({"role": "assistant", "content": reply})
+
+            folded = []
+            # Keep at least the latest exchange, even if it alone is over budget
+            while session.history_tokens() > self.history_budget and len(session.turns) > 2:
+                folded.extend(session.turns[:2])
+                del session.turns[:2]
+
+            if folded and summarize is not None:
+                transcript = "\n".join(f"{m['role']}: {m['content']}" for m in folded)
+                text = (f"Earlier summary: {session.summary}\n\n{transcript}"
+                        if session.summary else transcript)
+                try:
+                    session.summary = truncate_tokens(await summarize(text), self.summary_budget)
+                except Exception:
+                    pass  # keep the old summary; the folded turns are dropped
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def truncate_tokens(text, max_tokens):
+    """Cut text to roughly max_tokens (word boundaries)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    lo, hi = 0, len(words)
+    while lo < hi:  # longest word prefix that fits
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid])) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo]) + " ..."
@@ -0,0 +1,71 @@
+"""
+Concurrent load test for the ColourChat /api/chat endpoint.
+
+Fires --requests POSTs with at most --concurrency in flight and reports
+throughput and latency. Point the app at mock_openai.py so the numbers
+measure the server, not OpenAI:
+
+    python mock_openai.py --latency 1.0 &
+    OPENAI_API_KEY=test OPENAI_BASE_URL=http://127.0.0.1:8001/v1 python APImodel.py &
+    python load_test.py --concurrency 50 --requests 200
+
+For "before" numbers, run baseline_sync_app.py (the old sync Flask view)
+against the same mock instead of APImodel.py; it serves one request at a
+time unless started with --threaded.
+
+Cookies are refused, so each request is a new chat session.
+"""
+
+import argparse
+import asyncio
+import ssl
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+
+
+async def run(url, total, concurrency, prompt):
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+    ssl_context = ssl.create_default_context()  # built once; loading CA certs is slow
+
+    async def user():
+        # One client (and connection) per simulated user, like a browser tab.
+        # A single shared pool would spend most of the client's CPU in
+        # httpcore's pool bookkeeping, which grows with connections squared.
+        nonlocal errors
+        # Refuse cookies: every request is a new chat, not one ever-growing session
+        no_cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        limits = httpx.Limits(max_connections=1)
+        async with httpx.AsyncClient(timeout=120, limits=limits, cookies=no_cookies,
+                                     verify=ssl_context) as client:
+            for _ in remaining:
+                t0 = time.perf_counter()
+                try:
+                    r = await client.post(url, json={"prompt": prompt})
+                    r.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(min(concurrency, total))))
+    wall = time.perf_counter() - t0
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else float("nan")
+    print(f"requests={total} concurrency={concurrency} ok={len(latencies)} errors={errors}")
+    print(f"wall={wall:.2f}s throughput={len(latencies) / wall:.1f} req/s "
+          f"p50={pct(0.5) * 1000:.0f}ms p95={pct(0.95) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ColourChat load test")
+    parser.add_argument("--url", default="http://127.0.0.1:5000/api/chat")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--prompt", default="Hello ChatGPT — give me a friendly tip about clean code.")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.requests, args.concurrency, args.prompt))
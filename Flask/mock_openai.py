@@ -0,0 +1,87 @@
+"""
+Local stand-in for the OpenAI Chat Completions endpoint, for load tests.
+
+Every request waits MOCK_LATENCY seconds (like a slow completion) and
+returns a canned reply (streamed word by word when the request sets
+"stream": true); MOCK_FAIL_RATE of requests fail with a 503 so the retry
+path gets exercised.
+
+    python mock_openai.py --port 8001 --latency 1.0
+    OPENAI_API_KEY=test OPENAI_BASE_URL=http://127.0.0.1:8001/v1 python APImodel.py
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from quart import Quart, jsonify, request
+
+app = Quart(__name__)
+app.config["MOCK_LATENCY"] = 1.0
+app.config["MOCK_FAIL_RATE"] = 0.0
+app.config["MOCK_TOKEN_DELAY"] = 0.05  # seconds between streamed chunks
+
+REPLY = "Keep functions small and name things after what they do. Future you will say thanks!"
+
+
+@app.route("/v1/chat/completions", methods=["POST"])
+async def chat_completions():
+    body = await request.get_json()
+    await asyncio.sleep(app.config["MOCK_LATENCY"])  # time to first token
+    if random.random() < app.config["MOCK_FAIL_RATE"]:
+        return jsonify({"error": {"message": "mock overloaded", "type": "server_error"}}), 503
+
+    if body.get("stream"):
+        return stream_reply(body)
+
+    return jsonify({
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": REPLY},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 20, "completion_tokens": 20, "total_tokens": 40},
+    })
+
+
+def stream_reply(body):
+    """SSE chat.completion.chunk events, one word per chunk."""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    words = REPLY.split(" ")
+
+    def chunk(delta, finish_reason=None):
+        return "data: " + json.dumps({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }) + "\n\n"
+
+    async def events():
+        yield chunk({"role": "assistant", "content": ""})
+        for i, word in enumerate(words):
+            yield chunk({"content": word if i == 0 else " " + word})
+            await asyncio.sleep(app.config["MOCK_TOKEN_DELAY"])
+        yield chunk({}, "stop")
+        yield "data: [DONE]\n\n"
+
+    return events(), 200, {"Content-Type": "text/event-stream"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat completions server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per completion")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+    app.config["MOCK_LATENCY"] = args.latency
+    app.config["MOCK_FAIL_RATE"] = args.fail_rate
+    app.run(port=args.port)
@@ -0,0 +1,100 @@
+import asyncio
+
+import chat_sessions
+from chat_sessions import SessionStore, count_tokens
+
+
+def add(store, session, prompt, reply, summarize=None):
+    asyncio.run(store.add_turn(session, prompt, reply, summarize))
+
+
+def words(n, word="word"):
+    return " ".join([word] * n)
+
+
+def test_turns_kept_while_under_budget():
+    store = SessionStore(history_budget=10_000)
+    _, session = store.get_or_create(None)
+    for i in range(3):
+        add(store, session, f"q{i}", f"a{i}")
+    assert [m["content"] for m in session.turns] == ["q0", "a0", "q1", "a1", "q2", "a2"]
+    assert session.summary == ""
+
+
+def test_oldest_pairs_fold_into_summary():
+    store = SessionStore(history_budget=120, summary_budget=20)
+    _, session = store.get_or_create(None)
+    seen = []
+
+    async def summarize(text):
+        seen.append(text)
+        return "summary " + str(len(seen))
+
+    for i in range(6):
+        add(store, session, f"q{i} " + words(20), f"a{i} " + words(20), summarize)
+    assert session.history_tokens() <= 120
+    # Turns stay in user/assistant pairs, newest last
+    assert [m["role"] for m in session.turns] == ["user", "assistant"] * (len(session.turns) // 2)
+    assert session.turns[-1]["content"].startswith("a5")
+    assert session.summary == "summary " + str(len(seen))
+    # Later folds see the earlier summary
+    assert seen[0].startswith("user: q0")
+    assert seen[-1].startswith("Earlier summary: summary")
+
+
+def test_without_summarizer_old_turns_are_dropped():
+    store = SessionStore(history_budget=80)
+    _, session = store.get_or_create(None)
+    for i in range(5):
+        add(store, session, f"q{i} " + words(20), f"a{i}")
+    assert session.summary == ""
+    assert session.history_tokens() <= 80
+    assert session.turns[-2]["content"].startswith("q4")
+    assert not any(m["content"].startswith("q0") for m in session.turns)
+
+
+def test_latest_exchange_kept_even_over_budget():
+    store = SessionStore(history_budget=10)
+    _, session = store.get_or_create(None)
+    add(store, session, words(50), words(50))
+    assert len(session.turns) == 2
+
+
+def test_failed_summary_keeps_old_summary():
+    store = SessionStore(history_budget=60)
+    _, session = store.get_or_create(None)
+    session.summary = "kept"
+
+    async def broken(text):
+        raise RuntimeError("upstream down")
+
+    for i in range(4):
+        add(store, session, words(20), words(20), broken)
+    assert session.summary == "kept"
+    assert len(session.turns) == 2
+
+
+def test_summary_is_truncated_to_budget():
+    store = SessionStore(history_budget=60, summary_budget=10)
+    _, session = store.get_or_create(None)
+
+    async def verbose(text):
+        return words(200)
+
+    for i in range(4):
+        add(store, session, words(20), words(20), verbose)
+    assert count_tokens(session.summary) <= 10 + count_tokens(" ...")
+
+
+def test_sessions_expire_and_evict(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(chat_sessions.time, "time", lambda: now[0])
+    store = SessionStore(max_sessions=2, idle_ttl=60)
+    a, _ = store.get_or_create(None)
+    b, _ = store.get_or_create(None)
+    assert store.get_or_create(a)[0] == a  # a is now most recent
+    store.get_or_create(None)               # evicts b
+    assert store.get_or_create(b)[0] != b
+    now[0] += 61
+    assert store.get_or_create(a)[0] != a   # expired
+    assert len(store) == 1
@@ -15,11 +15,11 @@ Then run:
     python basic_chain_hf.py
 """
 
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
-from langchain_community.llms import HuggingFacePipeline
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from model_registry import get_llm, print_metrics
+
 
 def main() -> None:
     """Run a simple prompt -> local HF model -> string chain."""
@@ -27,22 +27,11 @@ def main() -> None:
     # 1. Choose a small causal language model
     model_name = "distilgpt2"  # small, fast, good for demos
 
-    # 2. Load tokenizer and model from Hugging Face (downloaded once, then cached)
-    print("Loading local model:", model_name)
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForCausalLM.from_pretrained(model_name)
-
-    # 3. Build a text-generation pipeline
-    gen_pipeline = pipeline(
-        "text-generation",
-        model=model,
-        tokenizer=tokenizer,
-        max_new_tokens=128,
-        temperature=0.7,
-    )
-
-    # 4. Wrap the HF pipeline with LangChain
-    llm = HuggingFacePipeline(pipeline=gen_pipeline)
+    # 2-4. Load tokenizer + model (downloaded once, then cached), build a
+    #      text-generation pipeline and wrap it for LangChain. The shared
+    #      registry loads each model once per process.
+    llm = get_llm(model_name, max_new_tokens=128, temperature=0.7)
+    print_metrics()
 
     # 5. Prompt template
     prompt = ChatPromptTemplate.from_messages(
@@ -0,0 +1,98 @@
+# benchmark_faiss_index.py
+"""
+Recall vs. latency vs. memory for the FAISS index types in faiss_indexes.py.
+
+Uses synthetic, clustered, L2-normalized 384-d vectors (the shape of
+all-MiniLM-L6-v2 embeddings), so no model download is needed. Ground truth
+is an exact flat search; recall@k is the fraction of the true top-k found.
+
+    python benchmark_faiss_index.py                       # 100k and 1M vectors
+    python benchmark_faiss_index.py --sizes 100000 --queries 500
+"""
+
+import argparse
+import time
+
+import numpy as np
+import faiss
+
+from faiss_indexes import build_index, set_search_params
+
+DIM = 384
+
+
+def serialized_bytes(index):
+    """Exact serialized size (makes a full in-RAM copy; fine for a benchmark)."""
+    return int(faiss.serialize_index(index).nbytes)
+
+# (index_type, build params, search knob name, values to sweep)
+SWEEPS = [
+    ("flat", {}, None, [None]),
+    ("hnsw", {"hnsw_m": 32}, "ef_search", [16, 64, 256]),
+    ("ivf_flat", {}, "nprobe", [1, 8, 32, 128]),
+    ("ivf_pq", {"pq_m": 48}, "nprobe", [1, 8, 32, 128]),
+]
+
+
+def synthetic_vectors(n, nq, dim=DIM, clusters=1000, seed=0):
+    """Clustered unit vectors (+ held-out queries from the same clusters)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+
+    def sample(count):
+        out = np.empty((count, dim), dtype=np.float32)
+        step = 100_000
+        for start in range(0, count, step):
+            m = min(step, count - start)
+            labels = rng.integers(0, clusters, m)
+            block = centers[labels] + 0.5 * rng.standard_normal((m, dim)).astype(np.float32)
+            block /= np.linalg.norm(block, axis=1, keepdims=True)
+            out[start:start + m] = block
+        return out
+
+    return sample(n), sample(nq)
+
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (k * len(truth))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=0, help="FAISS OpenMP threads (0 = default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+
+    print("n | index | knob | build_s | memory_MB | ms_per_query | recall@k")
+    for n in args.sizes:
+        xb, xq = synthetic_vectors(n, args.queries)
+        truth = None
+        for index_type, build_params, knob, values in SWEEPS:
+            t0 = time.perf_counter()
+            index = build_index(xb, index_type, build_params)
+            build_s = time.perf_counter() - t0
+            mem_mb = serialized_bytes(index) / 1e6
+
+            for value in values:
+                if knob:
+                    set_search_params(index, {knob: value})
+                t0 = time.perf_counter()
+                _, found = index.search(xq, args.k)
+                ms_per_query = (time.perf_counter() - t0) * 1000 / len(xq)
+                if truth is None:  # flat runs first: exact ground truth
+                    truth = found
+                recall = recall_at_k(found, truth, args.k)
+                knob_str = f"{knob}={value}" if knob else "-"
+                print(f"{n} | {index_type} | {knob_str} | {build_s:.1f} | {mem_mb:.0f} | "
+                      f"{ms_per_query:.3f} | {recall:.3f}")
+            del index
+
+
+if __name__ == "__main__":
+    main()
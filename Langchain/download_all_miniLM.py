@@ -1,8 +1,12 @@
-from sentence_transformers import SentenceTransformer
+from model_registry import EMBEDDING_MODEL_NAME, prefetch, verify
 
-model_name = "sentence-transformers/all-MiniLM-L6-v2"
+model_name = EMBEDDING_MODEL_NAME
 
 print("Downloading embedding model...")
-model = SentenceTransformer(model_name)
+prefetch(model_name)
+
+problems = verify(model_name)
+if problems:
+    raise SystemExit(f"{model_name} is incomplete: {'; '.join(problems)}")
 
 print("Done! Model is cached locally in the Hugging Face cache folder.")
@@ -1,11 +1,12 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from model_registry import LLM_MODEL_NAME, prefetch, verify
 
-model_name = "distilgpt2"
+model_name = LLM_MODEL_NAME
 
-print("Downloading tokenizer...")
-tokenizer = AutoTokenizer.from_pretrained(model_name)
+print("Downloading tokenizer and model...")
+prefetch(model_name)
 
-print("Downloading model...")
-model = AutoModelForCausalLM.from_pretrained(model_name)
+problems = verify(model_name)
+if problems:
+    raise SystemExit(f"{model_name} is incomplete: {'; '.join(problems)}")
 
 print("Done! Model is cached locally in the Hugging Face cache folder.")
@@ -0,0 +1,145 @@
+# faiss_indexes.py
+"""
+FAISS index types for the simple_rag_hf knowledge base.
+
+FAISS.from_texts always builds an exact flat index: every query scans every
+vector and all vectors are kept as full float32. For large knowledge bases
+an approximate index is much faster and/or smaller:
+
+- "flat"     exact search (default, best for small notes files)
+- "hnsw"     graph index, fast and accurate, uses more memory than flat
+- "ivf_flat" inverted lists; a query only scans `nprobe` of `nlist` clusters
+- "ivf_pq"   inverted lists + product quantization (vectors compressed to
+             `pq_m` bytes each), smallest memory footprint
+
+IVF indexes are trained on a random sample of the vectors. Search-time
+knobs (nprobe, efSearch) can be changed after building or loading.
+
+Used by simple_rag_hf.py and benchmark_faiss_index.py.
+"""
+
+import numpy as np
+import faiss
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# Defaults; nlist=None picks ~4*sqrt(n) clusters
+DEFAULT_PARAMS = {
+    "nlist": None,
+    "nprobe": 16,
+    "hnsw_m": 32,
+    "ef_construction": 80,
+    "ef_search": 64,
+    "pq_m": 48,          # bytes per vector for ivf_pq; must divide the dimension
+    "train_sample": 100_000,
+}
+
+# Below this many vectors an approximate index brings nothing; use flat.
+MIN_VECTORS_FOR_ANN = 1_000
+
+
+def resolve_params(params=None):
+    merged = dict(DEFAULT_PARAMS)
+    merged.update({k: v for k, v in (params or {}).items() if v is not None})
+    return merged
+
+
+def pick_nlist(n):
+    return max(1, min(65_536, int(4 * np.sqrt(n))))
+
+
+def make_trained_index(vectors, index_type="flat", params=None, seed=0):
+    """
+    Create an empty FAISS index for float32 vectors [n, d], trained on a
+    sample of them if the index type needs training.
+
+    The actual type may fall back to "flat" when there are too few vectors
+    to train an approximate index.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    p = resolve_params(params)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; choose one of {INDEX_TYPES}")
+    if index_type != "flat" and n < MIN_VECTORS_FOR_ANN:
+        index_type = "flat"
+
+    nlist = p["nlist"] or pick_nlist(n)
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, p["hnsw_m"])
+        index.hnsw.efConstruction = p["ef_construction"]
+    elif index_type == "ivf_flat":
+        index = faiss.index_factory(dim, f"IVF{nlist},Flat")
+    else:
+        if dim % p["pq_m"]:
+            raise ValueError(f"pq_m={p['pq_m']} must divide the embedding dimension {dim}")
+        index = faiss.index_factory(dim, f"IVF{nlist},PQ{p['pq_m']}x8")
+
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        size = min(n, max(p["train_sample"], 39 * nlist))
+        sample = vectors if size >= n else vectors[rng.choice(n, size, replace=False)]
+        index.train(sample)
+
+    set_search_params(index, p)
+    return index
+
+
+def build_index(vectors, index_type="flat", params=None, seed=0):
+    """Trained and populated index over vectors (see make_trained_index)."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = make_trained_index(vectors, index_type, params, seed)
+    index.add(vectors)
+    return index
+
+
+def set_search_params(index, params=None):
+    """Apply nprobe / efSearch to an index (no-op for flat)."""
+    p = resolve_params(params)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = p["nprobe"]
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = p["ef_search"]
+    return index
+
+
+def index_memory_bytes(index):
+    """
+    Estimated resident memory of the index, computed from its parameters
+    (no copy of the index is made, so it's cheap even at millions of vectors):
+    stored vectors/codes, plus IVF centroids, ids, PQ codebooks and the
+    IVF-PQ precomputed distance table (resident but not serialized), plus
+    the HNSW neighbor graph.
+    """
+    n, dim = index.ntotal, index.d
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf = faiss.downcast_index(ivf)          # IndexIVFPQ exposes .pq
+        total = n * (ivf.code_size + 8)          # codes + int64 ids in the inverted lists
+        total += ivf.nlist * dim * 4             # coarse centroids
+        pq = getattr(ivf, "pq", None)
+        if pq is not None:
+            total += pq.M * pq.ksub * pq.dsub * 4  # PQ codebooks
+            total += ivf.precomputed_table.size() * 4
+        return int(total)
+    if isinstance(index, faiss.IndexHNSW):
+        hnsw = index.hnsw
+        total = n * dim * 4                       # flat storage
+        total += hnsw.neighbors.size() * 4        # graph links (int32)
+        total += hnsw.levels.size() * 4 + hnsw.offsets.size() * 8
+        return int(total)
+    return int(n * getattr(index, "code_size", dim * 4))
+
+
+def describe_index(index):
+    ivf = faiss.try_extract_index_ivf(index)
+    parts = [type(index).__name__, f"ntotal={index.ntotal}"]
+    if ivf is not None:
+        parts.append(f"nlist={ivf.nlist} nprobe={ivf.nprobe}")
+    if isinstance(index, faiss.IndexHNSW):
+        parts.append(f"efSearch={index.hnsw.efSearch}")
+    parts.append(f"memory={index_memory_bytes(index) / 1e6:.1f} MB")
+    return " ".join(parts)
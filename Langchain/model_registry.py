@@ -0,0 +1,252 @@
+# model_registry.py
+"""
+Shared, cached model loading for the Langchain scripts.
+
+basic_chain_hf.py and simple_rag_hf.py both used to load distilgpt2 (and the
+MiniLM embedder) from scratch, and the download_*.py scripts were separate
+copies of the same loading code. This module loads each model at most once per
+process and hands out the same object to every caller:
+
+- causal LMs load with `low_cpu_mem_usage=True` and safetensors weights
+  (memory-mapped, no full extra copy in RAM); falls back to .bin if a repo
+  has no safetensors file
+- prefetch() downloads only the files we need, verify() checks they are
+  complete in the local cache (no network) and the weights open cleanly
+- every load is timed; load_metrics() / print_metrics() report it
+
+Set HF_HUB_OFFLINE=1 to never touch the network after prefetching.
+
+    python model_registry.py prefetch          # download + verify all models
+    python model_registry.py verify            # offline completeness check
+    python model_registry.py load              # time a cold load of each model
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+LLM_MODEL_NAME = "distilgpt2"
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# name -> kind; used by prefetch/verify/load when no names are given
+MODELS = {
+    LLM_MODEL_NAME: "causal_lm",
+    EMBEDDING_MODEL_NAME: "sentence_transformer",
+}
+
+# Files worth downloading (skips TF/Flax/ONNX/rust copies of the weights);
+# *.bin weights are only fetched for repos without safetensors
+ALLOW_PATTERNS = ["*.json", "*.txt", "*.model", "*.safetensors", "1_Pooling/*"]
+
+OFFLINE = os.environ.get("HF_HUB_OFFLINE", "").lower() in ("1", "true", "yes")
+
+_lock = threading.RLock()
+_cache = {}
+_metrics = {}
+
+
+# -------------------------------------------------------------------
+# Cache + metrics
+# -------------------------------------------------------------------
+def _cached(key, factory):
+    """Return _cache[key], building it once (thread-safe) and timing the build."""
+    with _lock:
+        if key in _cache:
+            _metrics[key]["hits"] += 1
+            return _cache[key]
+        t0 = time.perf_counter()
+        value = factory()
+        _metrics[key] = {"load_s": round(time.perf_counter() - t0, 3), "hits": 0}
+        _cache[key] = value
+        return value
+
+
+def load_metrics():
+    """Copy of {cache key: {"load_s": seconds, "hits": reuse count}}."""
+    with _lock:
+        return {key: dict(m) for key, m in _metrics.items()}
+
+
+def print_metrics(file=sys.stderr):
+    for key, m in load_metrics().items():
+        print(f"[model_registry] {key}: loaded in {m['load_s']:.2f}s, reused {m['hits']}x", file=file)
+
+
+def clear():
+    """Drop every cached model (mainly for benchmarks)."""
+    with _lock:
+        _cache.clear()
+        _metrics.clear()
+
+
+# -------------------------------------------------------------------
+# Loaders
+# -------------------------------------------------------------------
+def get_causal_lm(model_name=LLM_MODEL_NAME):
+    """(tokenizer, model) for a causal LM, loaded once per process."""
+
+    def load():
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        print(f"Loading local LLM: {model_name} ...")
+        tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=OFFLINE)
+        kwargs = {"low_cpu_mem_usage": True, "local_files_only": OFFLINE}
+        try:
+            model = AutoModelForCausalLM.from_pretrained(model_name, use_safetensors=True, **kwargs)
+        except OSError:
+            # Older repos only ship pytorch_model.bin
+            model = AutoModelForCausalLM.from_pretrained(model_name, **kwargs)
+        model.eval()
+        return tokenizer, model
+
+    return _cached(("causal_lm", model_name), load)
+
+
+def get_text_generation_pipeline(model_name=LLM_MODEL_NAME, max_new_tokens=128, temperature=0.7):
+    """transformers text-generation pipeline sharing the cached model weights."""
+
+    def load():
+        from transformers import pipeline
+
+        tokenizer, model = get_causal_lm(model_name)
+        return pipeline(
+            "text-generation",
+            model=model,
+            tokenizer=tokenizer,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+        )
+
+    return _cached(("pipeline", model_name, max_new_tokens, temperature), load)
+
+
+def get_llm(model_name=LLM_MODEL_NAME, max_new_tokens=128, temperature=0.7):
+    """LangChain HuggingFacePipeline LLM over the cached pipeline."""
+
+    def load():
+        from langchain_community.llms import HuggingFacePipeline
+
+        gen_pipeline = get_text_generation_pipeline(model_name, max_new_tokens, temperature)
+        return HuggingFacePipeline(pipeline=gen_pipeline)
+
+    return _cached(("llm", model_name, max_new_tokens, temperature), load)
+
+
+def get_sentence_transformer(model_name=EMBEDDING_MODEL_NAME):
+    """Raw SentenceTransformer model, loaded once per process."""
+
+    def load():
+        from sentence_transformers import SentenceTransformer
+
+        print(f"Loading embedding model: {model_name} ...")
+        return SentenceTransformer(model_name, local_files_only=OFFLINE)
+
+    return _cached(("sentence_transformer", model_name), load)
+
+
+def get_embeddings(model_name=EMBEDDING_MODEL_NAME):
+    """
+    LangChain Embeddings over the cached SentenceTransformer, so scripts that
+    also use the raw model don't hold a second copy of the weights.
+    """
+    from langchain_core.embeddings import Embeddings
+
+    class SentenceTransformerEmbeddings(Embeddings):
+        def __init__(self, model):
+            self.model = model
+
+        def embed_documents(self, texts):
+            return self.model.encode(list(texts), convert_to_numpy=True).tolist()
+
+        def embed_query(self, text):
+            return self.embed_documents([text])[0]
+
+    return _cached(
+        ("embeddings", model_name),
+        lambda: SentenceTransformerEmbeddings(get_sentence_transformer(model_name)),
+    )
+
+
+# -------------------------------------------------------------------
+# Prefetch / verify
+# -------------------------------------------------------------------
+def prefetch(model_name):
+    """Download the files a model needs into the HF cache; returns the local dir."""
+    from huggingface_hub import snapshot_download
+
+    local_dir = snapshot_download(model_name, allow_patterns=ALLOW_PATTERNS)
+    if not any(f.endswith(".safetensors") for f in os.listdir(local_dir)):
+        local_dir = snapshot_download(model_name, allow_patterns=ALLOW_PATTERNS + ["*.bin"])
+    return local_dir
+
+
+def verify(model_name):
+    """
+    Check, without network access, that a model is complete in the local
+    cache: config + tokenizer files present and the weights open cleanly.
+    Returns a list of problems (empty = OK).
+    """
+    from huggingface_hub import snapshot_download
+
+    try:
+        local_dir = snapshot_download(model_name, allow_patterns=ALLOW_PATTERNS + ["*.bin"], local_files_only=True)
+    except Exception as e:
+        return [f"not in local cache ({e.__class__.__name__})"]
+
+    files = set(os.listdir(local_dir))
+    problems = []
+    if "config.json" not in files:
+        problems.append("missing config.json")
+    if not files & {"tokenizer.json", "vocab.json", "vocab.txt", "tokenizer.model"}:
+        problems.append("missing tokenizer files")
+
+    weights = sorted(f for f in files if f.endswith(".safetensors"))
+    if weights:
+        from safetensors import safe_open
+
+        for name in weights:
+            try:
+                with safe_open(os.path.join(local_dir, name), framework="pt") as f:
+                    f.keys()
+            except Exception as e:
+                problems.append(f"{name}: unreadable ({e})")
+    elif not any(f.endswith(".bin") for f in files):
+        problems.append("missing weights (*.safetensors / *.bin)")
+    return problems
+
+
+def load(model_name):
+    """Load a model from the MODELS table through the cache."""
+    kind = MODELS.get(model_name, "causal_lm")
+    if kind == "sentence_transformer":
+        return get_sentence_transformer(model_name)
+    return get_causal_lm(model_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["prefetch", "verify", "load"])
+    parser.add_argument("models", nargs="*", help=f"model names (default: {', '.join(MODELS)})")
+    args = parser.parse_args()
+    names = args.models or list(MODELS)
+
+    failed = False
+    for name in names:
+        if args.command == "prefetch":
+            print(f"Downloading {name} ...")
+            print("  ->", prefetch(name))
+        if args.command in ("prefetch", "verify"):
+            problems = verify(name)
+            print(f"{name}: {'OK' if not problems else '; '.join(problems)}")
+            failed = failed or bool(problems)
+        else:
+            load(name)
+    if args.command == "load":
+        print_metrics(file=sys.stdout)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,22 @@
 Simple RAG (Retrieve + Generate) example using local Hugging Face models:
 
 - Local text-generation model via `transformers` + `HuggingFacePipeline`
-- Local sentence-transformers embeddings via `HuggingFaceEmbeddings`
-- FAISS as in-memory vector store
-- A local text file (data/notes.txt) as the knowledge base
+- Local sentence-transformers embeddings (loaded once via `model_registry.py`)
+- FAISS as vector store, saved to disk (faiss_index/) and reloaded on later runs
+- A local file (data/notes.txt) or a whole directory of .txt/.md/.json files
+  as the knowledge base, streamed line by line and embedded in batches
+
+The FAISS index type is configurable (see faiss_indexes.py): exact "flat"
+(default), or approximate "hnsw", "ivf_flat", "ivf_pq" for large knowledge
+bases, e.g.
+
+    RAG_INDEX_TYPE=ivf_pq RAG_NPROBE=32 python simple_rag_hf.py
+
+The saved index is keyed by a hash of the source file(s) + splitter settings +
+embedding model + index type. If nothing changed, startup just loads it. If the
+notes changed, only chunks whose text is new are re-embedded (the rest come
+from embedding_cache/). Every chunk keeps its source file and line number, so
+retrieved context is labelled for citations.
 
 NO Hugging Face Inference API and NO token required.
 
@@ -18,32 +31,89 @@ Setup (inside your virtual environment):
     pip install "langchain>=0.3" langchain-community langchain-text-splitters \
         transformers sentence-transformers faiss-cpu torch
 
+   With langchain 1.x also install langchain-classic (CacheBackedEmbeddings
+   and LocalFileStore moved there).
+
 2. Make sure you have a file:
 
     data/notes.txt
 
+   or point RAG_DATA_PATH at another file or a directory of notes:
+
+    RAG_DATA_PATH=path/to/notes_dir python simple_rag_hf.py
+
 3. Run:
 
     python simple_rag_hf.py
 
 Then type your questions at the prompt.
+
+Batch mode (offline evaluation jobs): answer every question in a file, or
+stdin with "-", and write one JSON line per question with timings:
+
+    python simple_rag_hf.py --batch questions.txt --out answers.jsonl --concurrency 4
+
+The questions file has one question per line, or JSON lines with a
+"question" field and an optional "id" field.
 """
 
 import os
+import sys
+import json
+import time
+import queue
+import argparse
+import hashlib
+import threading
 
-# ------------------ Transformers / HF models ------------------
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+import numpy as np
+
+from faiss_indexes import describe_index, make_trained_index, set_search_params
+from model_registry import EMBEDDING_MODEL_NAME, LLM_MODEL_NAME, get_embeddings, get_llm, print_metrics
 
 # ------------------ LangChain core & community ----------------
-from langchain_community.llms import HuggingFacePipeline
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+try:  # LangChain >= 1.0 moved these into langchain-classic
+    from langchain_classic.embeddings import CacheBackedEmbeddings
+    from langchain_classic.storage import LocalFileStore
+except ImportError:
+    from langchain.embeddings import CacheBackedEmbeddings
+    from langchain.storage import LocalFileStore
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
+
+
+# -------------------------------------------------------------------
+# Persistence settings
+# -------------------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.path.join(BASE_DIR, "faiss_index")          # index.faiss + index.pkl + manifest.json
+EMBED_CACHE_DIR = os.path.join(BASE_DIR, "embedding_cache") # one file per embedded chunk
+MANIFEST_NAME = "manifest.json"
+
+# Knowledge base: a single file or a directory (searched recursively)
+DATA_PATH = os.getenv("RAG_DATA_PATH", os.path.join(BASE_DIR, "data", "notes.txt"))
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".json", ".jsonl")
+READ_BLOCK_CHARS = 20_000   # text handed to the splitter at a time
+EMBED_BATCH_SIZE = 64       # chunks per embed_documents() call
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+RETRIEVAL_K = 3             # chunks retrieved per question
+BATCH_CHUNK_SIZE = 256      # questions retrieved/generated/written per round in batch mode
+
+# FAISS index type + knobs (nprobe: IVF clusters scanned, ef_search: HNSW beam width)
+INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat")
+INDEX_PARAMS = {
+    "nprobe": int(os.getenv("RAG_NPROBE", "16")),
+    "ef_search": int(os.getenv("RAG_EF_SEARCH", "64")),
+}
 
 
 # -------------------------------------------------------------------
@@ -54,72 +124,265 @@ def format_docs(docs):
     Convert a list of Document objects into one long context string.
 
     Each Document has a .page_content attribute that stores the text.
-    We join them with blank lines so the LLM sees them as separate chunks.
+    We join them with blank lines so the LLM sees them as separate chunks,
+    each labelled with its source file and line for citations.
     """
-    return "\n\n".join(doc.page_content for doc in docs)
+    return "\n\n".join(
+        f"[{doc.metadata.get('source', '?')}:{doc.metadata.get('line', '?')}]\n{doc.page_content}"
+        for doc in docs
+    )
 
 
 # -------------------------------------------------------------------
-# Build the RAG chain (Retrieve + Generate)
+# Helpers: persisted FAISS index
 # -------------------------------------------------------------------
-def build_rag_chain():
+def list_source_files(data_path):
+    """data_path itself if it is a file, else every supported file under it (sorted)."""
+    if os.path.isfile(data_path):
+        return [data_path]
+    files = []
+    for root, _, names in os.walk(data_path):
+        for name in names:
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def source_name(path, data_path):
+    if os.path.isfile(data_path):
+        return os.path.basename(path)
+    return os.path.relpath(path, data_path).replace(os.sep, "/")
+
+
+def index_key(data_path):
     """
-    Build a simple RAG pipeline using only local models.
+    Hash of the source file names + contents + everything that changes the
+    chunks or their vectors. If this matches the saved manifest, the index
+    on disk is up to date.
+    """
+    h = hashlib.sha256()
+    for path in list_source_files(data_path):
+        h.update(source_name(path, data_path).encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    settings = {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "index_type": INDEX_TYPE,
+    }
+    h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def read_manifest():
+    path = os.path.join(INDEX_DIR, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(key, data_path, num_chunks):
+    with open(os.path.join(INDEX_DIR, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"key": key, "source": data_path, "chunks": num_chunks}, f, indent=2)
+
+
+def make_embeddings():
+    """
+    Sentence-transformers embeddings wrapped in a per-chunk disk cache.
 
-    Steps:
-    1. Read the knowledge base from data/notes.txt
-    2. Split it into smaller text chunks
-    3. Turn chunks into embeddings and store them in a FAISS index
-    4. Create a retriever over the FAISS index
-    5. Define a prompt template that takes {context} + {question}
-    6. Use a local HF text-generation model as the LLM
-    7. Combine everything into a LangChain runnable (rag_chain)
+    CacheBackedEmbeddings stores each chunk's vector under a hash of its text,
+    so rebuilding after an edit only runs the model on new/changed chunks.
+    """
+    underlying = get_embeddings(EMBEDDING_MODEL_NAME)
+    store = LocalFileStore(EMBED_CACHE_DIR)
+    return CacheBackedEmbeddings.from_bytes_store(
+        underlying, store, namespace=EMBEDDING_MODEL_NAME
+    )
+
+
+# -------------------------------------------------------------------
+# Helpers: streaming ingestion
+# -------------------------------------------------------------------
+def iter_file_chunks(path, source, splitter):
     """
+    Stream one file line by line and yield (chunk_text, metadata).
 
-    # 1. Read our local knowledge base
-    data_path = os.path.join("LangChainEx1\data", "notes.txt")
-    if not os.path.exists(data_path):
-        raise FileNotFoundError(
-            f"Knowledge base file not found at: {data_path}\n"
-            "Create data/notes.txt with your notes before running this script."
-        )
+    Lines are collected into ~READ_BLOCK_CHARS blocks for the splitter. The
+    last chunk of each block is carried into the next block, so chunks are
+    never cut at block edges and memory stays bounded by the block size.
+    """
+    chunk_no = 0
+    block, block_size, block_line = [], 0, 1
+
+    def split(text, final):
+        nonlocal chunk_no, block_line
+        docs = splitter.create_documents([text])
+        keep = docs if final else docs[:-1]
+        for doc in keep:
+            start = max(0, doc.metadata.get("start_index", 0))
+            meta = {"source": source, "chunk": chunk_no, "line": block_line + text.count("\n", 0, start)}
+            chunk_no += 1
+            yield doc.page_content, meta
+        if final or not docs:
+            return ""
+        carry_from = max(0, docs[-1].metadata.get("start_index", 0))
+        block_line += text.count("\n", 0, carry_from)
+        return text[carry_from:]
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            block.append(line)
+            block_size += len(line)
+            if block_size >= READ_BLOCK_CHARS:
+                carry = yield from split("".join(block), final=False)
+                block, block_size = [carry], len(carry)
+    text = "".join(block)
+    if text.strip():
+        yield from split(text, final=True)
+
+
+def read_chunks(data_path, splitter, out_queue):
+    """Producer thread: push (text, metadata) for every chunk, then None."""
+    try:
+        for path in list_source_files(data_path):
+            for item in iter_file_chunks(path, source_name(path, data_path), splitter):
+                out_queue.put(item)
+    except Exception as e:
+        out_queue.put(e)
+    finally:
+        out_queue.put(None)
+
+
+def embed_stream(data_path, splitter, embeddings):
+    """
+    Embed chunks in EMBED_BATCH_SIZE batches while a reader thread keeps
+    streaming files into the queue. Returns (texts, metadatas, vectors).
+    """
+    chunk_queue = queue.Queue(maxsize=EMBED_BATCH_SIZE * 4)
+    reader = threading.Thread(target=read_chunks, args=(data_path, splitter, chunk_queue), daemon=True)
+    reader.start()
+
+    texts, metadatas, vectors = [], [], []
 
-    with open(data_path, "r", encoding="utf-8") as f:
-        full_text = f.read()
+    def flush(batch):
+        batch_texts = [t for t, _ in batch]
+        vectors.extend(embeddings.embed_documents(batch_texts))
+        texts.extend(batch_texts)
+        metadatas.extend(m for _, m in batch)
 
-    if not full_text.strip():
-        raise ValueError("data/notes.txt is empty. Add some content and try again.")
+    batch = []
+    while True:
+        item = chunk_queue.get()
+        if item is None:
+            break
+        if isinstance(item, Exception):
+            raise item
+        batch.append(item)
+        if len(batch) >= EMBED_BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    reader.join()
+    return texts, metadatas, np.asarray(vectors, dtype=np.float32)
+
+
+def load_or_build_vectorstore(data_path, embeddings):
+    """Load the saved FAISS index if it matches data_path, otherwise rebuild and save it."""
+    key = index_key(data_path)
+    if read_manifest().get("key") == key:
+        print(f"Loading saved FAISS index from {INDEX_DIR}")
+        # Our own pickle written by save_local below, so deserialization is safe here
+        vectorstore = FAISS.load_local(
+            INDEX_DIR, embeddings, allow_dangerous_deserialization=True
+        )
+        set_search_params(vectorstore.index, INDEX_PARAMS)
+        print("Index:", describe_index(vectorstore.index))
+        return vectorstore
 
-    # 2. Split the text into manageable overlapping chunks
+    # Split the text into manageable overlapping chunks
     #    - chunk_size: max characters per chunk
     #    - chunk_overlap: overlap between chunks to preserve context
+    #    - add_start_index: lets us work out each chunk's line number
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        add_start_index=True,
     )
-    chunks = splitter.split_text(full_text)
+
+    # Files are read + split on a background thread while this one embeds.
+    # Only chunks missing from embedding_cache/ go through the model.
+    print(f"Building {INDEX_TYPE} FAISS index from {data_path} ...")
+    chunks, metadatas, vectors = embed_stream(data_path, splitter, embeddings)
 
     if not chunks:
         raise ValueError(
-            "No text chunks were created from notes.txt. "
-            "Check that the file actually contains text."
+            f"No text chunks were created from {data_path}. "
+            "Check that the notes actually contain text."
+        )
+    print(f"Embedded {len(chunks)} chunks from {len({m['source'] for m in metadatas})} file(s)")
+
+    # Train/build the chosen index type, then wrap it in LangChain's FAISS store
+    index = make_trained_index(vectors, INDEX_TYPE, INDEX_PARAMS)
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    vectorstore.add_embeddings(list(zip(chunks, vectors)), metadatas=metadatas)
+    print("Index:", describe_index(vectorstore.index))
+    vectorstore.save_local(INDEX_DIR)
+    write_manifest(key, data_path, len(chunks))
+    return vectorstore
+
+
+# -------------------------------------------------------------------
+# Build the RAG chain (Retrieve + Generate)
+# -------------------------------------------------------------------
+def build_rag_components():
+    """
+    Build a simple RAG pipeline using only local models.
+
+    Steps:
+    1. Locate the knowledge base (data/notes.txt or RAG_DATA_PATH)
+    2. Set up embeddings (with a per-chunk disk cache)
+    3. Load the saved FAISS index, or split + embed + save it if notes changed
+    4. Create a retriever over the FAISS index
+    5. Define a prompt template that takes {context} + {question}
+    6. Use a local HF text-generation model as the LLM
+    7. Combine everything into a LangChain runnable (rag_chain)
+
+    Returns a dict with the vectorstore, embeddings, answer_chain
+    ({"context", "question"} -> answer) and the full rag_chain.
+    """
+
+    # 1. Locate our local knowledge base
+    data_path = DATA_PATH
+    if not os.path.exists(data_path) or not list_source_files(data_path):
+        raise FileNotFoundError(
+            f"Knowledge base not found at: {data_path}\n"
+            "Create data/notes.txt (or set RAG_DATA_PATH to a file/directory of notes) "
+            "before running this script."
         )
 
-    # 3. Local embeddings using sentence-transformers
+    # 2. Local embeddings using sentence-transformers
     #    This downloads the model the first time and then caches it.
     #    all-MiniLM-L6-v2 is small and fast for demos.
-    embedding_model_name = "sentence-transformers/all-MiniLM-L6-v2"
-    embeddings = HuggingFaceEmbeddings(model_name=embedding_model_name)
+    embeddings = make_embeddings()
 
-    # 4. Create a FAISS vector store from the text chunks
-    #    FAISS stores embeddings and allows efficient similarity search.
-    vectorstore = FAISS.from_texts(chunks, embedding=embeddings)
+    # 3. FAISS vector store: loaded from faiss_index/ when the notes and the
+    #    splitter settings are unchanged, rebuilt (reusing cached vectors) otherwise.
+    vectorstore = load_or_build_vectorstore(data_path, embeddings)
 
-    # 5. Turn the vector store into a retriever
+    # 4. Turn the vector store into a retriever
     #    search_kwargs={"k": 3} means: return top 3 similar chunks for each query.
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
+    retriever = vectorstore.as_retriever(search_kwargs={"k": RETRIEVAL_K})
 
-    # 6. Define the RAG prompt template
+    # 5. Define the RAG prompt template
     #    The LLM will see the context and the question together.
     prompt = ChatPromptTemplate.from_template(
         """
@@ -134,62 +397,167 @@ Question:
 """
     )
 
-    # 7. Define the local LLM via transformers
+    # 6. Define the local LLM via transformers
     #    distilgpt2 is small and works well enough for demo purposes.
-    llm_model_name = "distilgpt2"
-
-    print(f"Loading local LLM: {llm_model_name} ...")
-    tokenizer = AutoTokenizer.from_pretrained(llm_model_name)
-    model = AutoModelForCausalLM.from_pretrained(llm_model_name)
-
-    # Build a text-generation pipeline
-    gen_pipeline = pipeline(
-        "text-generation",
-        model=model,
-        tokenizer=tokenizer,
+    #    The shared model registry loads it once per process (safetensors,
+    #    low_cpu_mem_usage) and wraps the pipeline so LangChain can treat it
+    #    as an LLM.
+    llm = get_llm(
+        LLM_MODEL_NAME,
         max_new_tokens=128,   # how many tokens to generate
         temperature=0.7,      # creativity / randomness
     )
+    print_metrics()
 
-    # Wrap the pipeline so LangChain can treat it as an LLM
-    llm = HuggingFacePipeline(pipeline=gen_pipeline)
-
-    # 8. Output parser: converts the model output to a string
+    # 7. Output parser: converts the model output to a string
     parser = StrOutputParser()
 
-    # 9. Build the RAG chain using LangChain's runnable composition
+    # 8. Build the RAG chain using LangChain's runnable composition
     #
     # RunnableParallel:
     #   - Takes the user question as input
     #   - context = retriever(question) -> format_docs -> string
     #   - question = the same raw question (RunnablePassthrough)
     #
-    # Then we pipe the result into:
+    # Then we pipe the result into answer_chain:
     #   - prompt (fills {context} and {question})
     #   - llm (local model)
     #   - parser (clean string output)
+    answer_chain = prompt | llm | parser
     rag_chain = (
         RunnableParallel(
             context=retriever | format_docs,
             question=RunnablePassthrough(),
         )
-        | prompt
-        | llm
-        | parser
+        | answer_chain
     )
 
-    return rag_chain
+    return {
+        "vectorstore": vectorstore,
+        "embeddings": embeddings,
+        "answer_chain": answer_chain,
+        "rag_chain": rag_chain,
+    }
+
+
+def build_rag_chain():
+    """Build the question -> answer RAG chain (see build_rag_components)."""
+    return build_rag_components()["rag_chain"]
+
+
+# -------------------------------------------------------------------
+# Batch mode
+# -------------------------------------------------------------------
+def read_questions(path):
+    """Yield (id, question) from a text/JSONL file, or stdin when path is "-"."""
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for n, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                yield item.get("id", n), item["question"]
+            else:
+                yield n, line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def retrieve_batch(vectorstore, embeddings, questions, k=RETRIEVAL_K):
+    """
+    Retrieve for many questions with one embedding batch and one FAISS
+    search call over the whole query matrix. Returns a list of Document lists.
+    """
+    # Query vectors are not worth caching on disk; use the raw model
+    base = getattr(embeddings, "underlying_embeddings", embeddings)
+    query_vectors = np.asarray(base.embed_documents(questions), dtype=np.float32)
+    _, indices = vectorstore.index.search(query_vectors, k)
+    results = []
+    for row in indices:
+        results.append([
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(i)])
+            for i in row if i != -1
+        ])
+    return results
+
+
+def run_batch(components, questions_path, out, concurrency=4, k=RETRIEVAL_K):
+    """Answer every question from questions_path and write JSON lines to out."""
+    answer_chain = components["answer_chain"]
+    config = {"max_concurrency": concurrency}
+
+    def timed_answer(inputs):
+        # Runs on a worker thread, so this is the item's own generation time
+        t0 = time.perf_counter()
+        try:
+            answer = answer_chain.invoke(inputs)
+        except Exception as e:
+            answer = e
+        return answer, (time.perf_counter() - t0) * 1000
+
+    timed_chain = RunnableLambda(timed_answer)
+    total = 0
+    pending = read_questions(questions_path)
+
+    while True:
+        chunk = [item for _, item in zip(range(BATCH_CHUNK_SIZE), pending)]
+        if not chunk:
+            break
+        ids, questions = [i for i, _ in chunk], [q for _, q in chunk]
+
+        t0 = time.perf_counter()
+        docs_per_q = retrieve_batch(components["vectorstore"], components["embeddings"], questions, k)
+        retrieve_ms = (time.perf_counter() - t0) * 1000 / len(questions)
+
+        inputs = [{"context": format_docs(docs), "question": q} for docs, q in zip(docs_per_q, questions)]
+        for i, (answer, generate_ms) in timed_chain.batch_as_completed(inputs, config=config):
+            record = {
+                "id": ids[i],
+                "question": questions[i],
+                "sources": [f"{d.metadata.get('source')}:{d.metadata.get('line')}" for d in docs_per_q[i]],
+                "retrieve_ms": round(retrieve_ms, 2),  # amortized over the batched search
+                "generate_ms": round(generate_ms, 2),
+            }
+            if isinstance(answer, Exception):
+                record["error"] = str(answer)
+            else:
+                record["answer"] = answer
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        total += len(questions)
+        print(f"Answered {total} questions", file=sys.stderr)
 
 
 # -------------------------------------------------------------------
 # CLI entry point
 # -------------------------------------------------------------------
 def main():
+    parser = argparse.ArgumentParser(description="Simple LangChain RAG demo (local Hugging Face models)")
+    parser.add_argument("--batch", metavar="FILE", help='answer all questions in FILE ("-" for stdin) and exit')
+    parser.add_argument("--out", default="-", help='JSONL output for --batch (default "-" = stdout)')
+    parser.add_argument("--concurrency", type=int, default=4, help="max parallel generations in --batch mode")
+    parser.add_argument("--k", type=int, default=RETRIEVAL_K, help="chunks retrieved per question")
+    args = parser.parse_args()
+
     # Build the RAG pipeline once at startup
-    rag_chain = build_rag_chain()
+    components = build_rag_components()
+
+    if args.batch:
+        out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+        try:
+            run_batch(components, args.batch, out, concurrency=args.concurrency, k=args.k)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return
+
+    rag_chain = components["rag_chain"]
 
     print("Simple LangChain RAG demo (Local Hugging Face Models)")
-    print("Your knowledge base is: data/notes.txt")
+    print("Your knowledge base is:", DATA_PATH)
     print("Ask a question about its content.")
     print("Type 'exit' or 'quit' to stop.\n")
 
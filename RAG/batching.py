@@ -0,0 +1,88 @@
+"""
+Dynamic batching for the RAG generator.
+
+Requests from many threads are queued. A single worker thread collects
+them for up to max_wait_ms (or until max_batch_size is reached), runs
+them through the generator as one padded batch and hands each caller its
+own result through a Future.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class BatchScheduler:
+    """Collects prompts for a few milliseconds and runs them as one generate() call."""
+
+    def __init__(self, generate_fn, max_batch_size=8, max_wait_ms=10):
+        """generate_fn takes a list of prompts and returns one output per prompt, in order."""
+        self.generate_fn = generate_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="gen-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt):
+        fut = Future()
+        self._queue.put((prompt, fut))
+        return fut
+
+    def generate(self, prompt, timeout=None):
+        return self.submit(prompt).result(timeout)
+
+    def generate_many(self, prompts, timeout=None):
+        futures = [self.submit(p) for p in prompts]
+        return [f.result(timeout) for f in futures]
+
+    @property
+    def mean_batch_size(self):
+        return self.requests / self.batches if self.batches else 0.0
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = [item], False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._run(batch)
+            if stop:
+                return
+
+    def _run(self, batch):
+        self.batches += 1
+        self.requests += len(batch)
+        try:
+            outputs = list(self.generate_fn([prompt for prompt, _ in batch]))
+            if len(outputs) != len(batch):
+                raise RuntimeError(f"generate_fn returned {len(outputs)} outputs for {len(batch)} prompts")
+        except Exception as e:
+            # Fail every caller rather than leave some futures pending forever
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        for (_, fut), out in zip(batch, outputs):
+            fut.set_result(out)
@@ -0,0 +1,98 @@
+"""
+Latency / memory benchmark of the RAG inference backends.
+
+Each backend runs in its own subprocess so peak memory is measured cleanly:
+
+    python benchmark_backends.py                       # torch vs onnx
+    python benchmark_backends.py --backends onnx --threads 4 --runs 20
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from onnx_backend import EMBED_MODEL_NAME, GEN_MODEL_NAME, SAMPLE_PROMPTS, SAMPLE_TEXTS
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_backend(name, threads):
+    if name == "onnx":
+        from onnx_backend import OnnxEmbeddingFunction, load_onnx_generator
+
+        return OnnxEmbeddingFunction(num_threads=threads), load_onnx_generator(num_threads=threads)
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from transformers import pipeline
+
+    if threads:
+        torch.set_num_threads(threads)
+    model = SentenceTransformer(EMBED_MODEL_NAME, device="cpu")
+    embed = lambda texts: model.encode(list(texts), normalize_embeddings=True)
+    return embed, pipeline("text2text-generation", model=GEN_MODEL_NAME, device=-1)
+
+
+def timed(fn, runs):
+    fn()  # warm-up
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def run_child(backend, threads, runs):
+    rss_before = peak_rss_mb()
+    t0 = time.perf_counter()
+    embed, gen = load_backend(backend, threads)
+    load_s = time.perf_counter() - t0
+    result = {
+        "backend": backend,
+        "threads": threads,
+        "load_s": round(load_s, 2),
+        "embed_query_ms": timed(lambda: embed(SAMPLE_TEXTS[-1:]), runs),
+        "embed_batch_ms": timed(lambda: embed(SAMPLE_TEXTS), runs),
+        "generate_ms": timed(lambda: gen(SAMPLE_PROMPTS[0], max_length=64), runs),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "model_rss_mb": round(peak_rss_mb() - rss_before, 1),
+    }
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=["torch", "onnx"])
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = library default)")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.threads or None, args.runs)
+        return
+
+    rows = []
+    for backend in args.backends:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", backend, "--threads", str(args.threads), "--runs", str(args.runs)],
+            capture_output=True, text=True, check=True,
+        )
+        rows.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    cols = ["backend", "threads", "load_s", "embed_query_ms", "embed_batch_ms", "generate_ms", "peak_rss_mb", "model_rss_mb"]
+    print(" | ".join(cols))
+    for row in rows:
+        print(" | ".join(str(row[c]) for c in cols))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Throughput benchmark: serial flan-t5 generation vs. the dynamic batcher.
+
+Simulates N concurrent clients each sending prompts. The serial path runs
+one prompt per generate() call behind the engine's lock (the old
+behaviour); the batched path goes through BatchScheduler.
+
+    python benchmark_batching.py --clients 8 --requests 64
+    python benchmark_batching.py --max-batch 4 16 --max-wait-ms 5 20
+"""
+
+import argparse
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batching import BatchScheduler
+from engine import InstituteRAG
+
+PROMPTS = [
+    "Answer using the context. Context: Course Code: MCA-301, Fees: ₹95,000 per year. Question: What are the MCA fees?",
+    "Answer using the context. Context: Location: Pune, Maharashtra, India. Question: Where is the institute?",
+    "Answer using the context. Context: Name: Rajat Kumar, Fees Pending: ₹35,000. Question: How much does Rajat owe?",
+    "Answer using the context. Context: Established: 2012. Question: When was the college established?",
+]
+
+
+def run_load(call, clients, requests):
+    latencies = []
+
+    def one(i):
+        t0 = time.perf_counter()
+        call(PROMPTS[i % len(PROMPTS)])
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "throughput_rps": round(requests / wall, 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 1),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--max-batch", nargs="+", type=int, default=[8])
+    parser.add_argument("--max-wait-ms", nargs="+", type=float, default=[10])
+    args = parser.parse_args()
+
+    rag = InstituteRAG(max_batch_size=1)
+    rag.generate_batch(PROMPTS[:1])  # load + warm up
+
+    rows = [("serial", 1, 0, run_load(lambda p: rag.generate_batch([p])[0], args.clients, args.requests), 1.0)]
+    for max_batch, max_wait in itertools.product(args.max_batch, args.max_wait_ms):
+        batcher = BatchScheduler(rag.generate_batch, max_batch_size=max_batch, max_wait_ms=max_wait)
+        stats = run_load(batcher.generate, args.clients, args.requests)
+        rows.append(("batched", max_batch, max_wait, stats, round(batcher.mean_batch_size, 2)))
+        batcher.close()
+
+    print(f"clients={args.clients} requests={args.requests}")
+    print("mode | max_batch | max_wait_ms | throughput_rps | p50_ms | p95_ms | mean_batch")
+    for mode, max_batch, max_wait, stats, mean_batch in rows:
+        print(f"{mode} | {max_batch} | {max_wait} | {stats['throughput_rps']} | "
+              f"{stats['p50_ms']} | {stats['p95_ms']} | {mean_batch}")
+
+
+if __name__ == "__main__":
+    main()
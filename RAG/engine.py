@@ -0,0 +1,258 @@
+"""
+InstituteRAG: the Institute JSON RAG pipeline as an importable engine.
+
+One instance owns the Chroma collection, BM25 and field indexes, query
+caches and model handles. Handles are created lazily, once, behind a lock,
+so a single engine can be shared by many threads / Streamlit sessions.
+
+    from engine import InstituteRAG
+
+    rag = InstituteRAG()
+    print(rag.answer("What are the fees for MCA?")["answer"])
+
+CLI:
+
+    python engine.py "fees for MCA" "Where is Green Valley College located?"
+"""
+
+import argparse
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import chromadb
+
+from batching import BatchScheduler
+from rag_core import (
+    CHROMA_DIR, COLLECTION_NAME, DATA_DIR, EMBED_MODEL_NAME, HYBRID_ALPHA, INFERENCE_BACKEND,
+    ORT_THREADS, QueryCache, build_bm25_index, build_field_index, build_prompt, hybrid_retrieve,
+    ingest, make_chunk_tokenizer, make_embedding_function, make_generator, make_reranker,
+    normalize_query, open_collection,
+)
+
+logger = logging.getLogger(__name__)
+
+NO_ANSWER = "I don't know from this text."
+GEN_MAX_LENGTH = 250
+GEN_MAX_BATCH_SIZE = int(os.getenv("RAG_GEN_MAX_BATCH", "8"))
+GEN_MAX_WAIT_MS = float(os.getenv("RAG_GEN_MAX_WAIT_MS", "10"))
+
+
+class InstituteRAG:
+    """Thread-safe retrieve + generate engine over the institute JSON files."""
+
+    def __init__(self, data_dir=DATA_DIR, chroma_dir=CHROMA_DIR, collection_name=COLLECTION_NAME,
+                 embed_model=EMBED_MODEL_NAME, backend=INFERENCE_BACKEND, num_threads=ORT_THREADS,
+                 client=None, max_batch_size=GEN_MAX_BATCH_SIZE, max_wait_ms=GEN_MAX_WAIT_MS):
+        self.data_dir = data_dir
+        self.chroma_dir = chroma_dir
+        self.collection_name = collection_name
+        self.embed_model = embed_model
+        self.backend = backend
+        self.num_threads = num_threads
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.query_cache = QueryCache()
+        self._client = client
+        self._handles = {}
+        self._lock = threading.RLock()
+        # HF pipelines keep per-call state; run one generate() at a time
+        self._gen_lock = threading.Lock()
+
+    # ---------------------------
+    # Shared handles
+    # ---------------------------
+    def _get(self, name, factory):
+        if name in self._handles:
+            return self._handles[name]
+        with self._lock:
+            if name not in self._handles:
+                self._handles[name] = factory()
+            return self._handles[name]
+
+    def _reset(self, *names):
+        with self._lock:
+            for name in names:
+                self._handles.pop(name, None)
+
+    @property
+    def client(self):
+        def factory():
+            if self._client is not None:
+                return self._client
+            os.makedirs(self.chroma_dir, exist_ok=True)
+            return chromadb.PersistentClient(path=self.chroma_dir)
+        return self._get("client", factory)
+
+    @property
+    def embedding_function(self):
+        return self._get("ef", lambda: make_embedding_function(self.embed_model, self.backend, self.num_threads))
+
+    @property
+    def collection(self):
+        def factory():
+            collection = open_collection(self.client, self.collection_name, self.embedding_function,
+                                         self.embed_model, self.backend)
+            if ingest(collection, self.data_dir, tokenizer=make_chunk_tokenizer(self.embed_model)):
+                self.query_cache.invalidate()
+            return collection
+        return self._get("collection", factory)
+
+    @property
+    def bm25(self):
+        return self._get("bm25", lambda: build_bm25_index(self.collection))
+
+    @property
+    def field_index(self):
+        return self._get("field_index", lambda: build_field_index(self.data_dir))
+
+    @property
+    def generator(self):
+        def factory():
+            try:
+                return make_generator(backend=self.backend, num_threads=self.num_threads)
+            except Exception as e:
+                logger.error(f"Could not load text generation model: {e}")
+                return None
+        return self._get("generator", factory)
+
+    @property
+    def reranker(self):
+        def factory():
+            try:
+                return make_reranker()
+            except Exception as e:
+                logger.error(f"Could not load reranker model: {e}")
+                return None
+        return self._get("reranker", factory)
+
+    @property
+    def batcher(self):
+        """Shared dynamic batcher in front of the generator (see batching.py)."""
+        return self._get("batcher", lambda: BatchScheduler(
+            self.generate_batch, max_batch_size=self.max_batch_size, max_wait_ms=self.max_wait_ms))
+
+    # ---------------------------
+    # Ingest
+    # ---------------------------
+    def ingest(self, force=False):
+        """(Re)build the collection and indexes; returns the number of chunks."""
+        with self._lock:
+            if force:
+                try:
+                    self.client.delete_collection(self.collection_name)
+                except Exception:
+                    pass
+                self._reset("collection", "bm25", "field_index")
+                self.query_cache.invalidate()
+            count = self.collection.count()
+            _ = (self.bm25, self.field_index)  # build eagerly
+            return count
+
+    # ---------------------------
+    # Retrieve
+    # ---------------------------
+    def embed_query(self, query):
+        key = normalize_query(query)
+        emb = self.query_cache.embeddings.get(key)
+        if emb is None:
+            emb = self.embedding_function([key])[0]
+            self.query_cache.embeddings.put(key, emb)
+        return emb
+
+    def retrieve(self, query, top_k=3, rerank=False, alpha=HYBRID_ALPHA):
+        """Top-k (doc, meta) chunks for query from hybrid BM25 + vector search."""
+        collection = self.collection
+        cache = self.query_cache
+        key = (cache.version, collection.count(), normalize_query(query), top_k, rerank, alpha)
+        hit = cache.results.get(key)
+        if hit is not None:
+            return list(hit)
+
+        bm25 = self.bm25
+        ranked = hybrid_retrieve(query, self.embed_query(query), collection, bm25, top_k=top_k,
+                                 alpha=alpha, reranker=self.reranker if rerank else None)
+        ctx = [(bm25.docs[i], bm25.metas[i]) for i in ranked]
+        cache.results.put(key, ctx)
+        return list(ctx)
+
+    # ---------------------------
+    # Answer
+    # ---------------------------
+    def _prepare(self, query, history, top_k, rerank):
+        """Direct field answer, or (None, context, prompt, stats) for generation."""
+        direct = self.field_index.lookup(query)
+        if direct:
+            return direct[0], direct[1], None, None
+        ctx = self.retrieve(query, top_k=top_k, rerank=rerank)
+        gen = self.generator
+        prompt, stats = build_prompt(history or [], query, ctx, tokenizer=gen.tokenizer if gen else None)
+        return None, ctx, prompt, stats
+
+    @staticmethod
+    def _result(answer, ctx, stats, direct):
+        return {"answer": answer, "context": ctx, "prompt_stats": stats, "direct": direct}
+
+    def generate_batch(self, prompts):
+        """Run prompts through the generator as one padded batch (no queueing)."""
+        gen = self.generator
+        if gen is None:
+            return ["Model not available."] * len(prompts)
+        with self._gen_lock:
+            outs = gen(prompts, max_length=GEN_MAX_LENGTH, truncation=True, batch_size=len(prompts))
+        # a list input gives one dict per prompt (or a one-item list on older versions)
+        outs = [out[0] if isinstance(out, list) else out for out in outs]
+        return [(out["generated_text"].strip() or NO_ANSWER) for out in outs]
+
+    def _generate(self, prompts):
+        if self.max_batch_size <= 1:
+            return self.generate_batch(prompts)
+        return self.batcher.generate_many(prompts)
+
+    def answer(self, query, history=None, top_k=3, rerank=False):
+        """
+        Answer one question. history is a list of {"role", "text"} turns.
+
+        Returns a dict with answer, context [(doc, meta)], prompt_stats and
+        direct (True when the structured field index answered it).
+        """
+        answer, ctx, prompt, stats = self._prepare(query, history, top_k, rerank)
+        if answer is not None:
+            return self._result(answer, ctx, None, True)
+        return self._result(self._generate([prompt])[0], ctx, stats, False)
+
+    def batch_answer(self, queries, top_k=3, rerank=False, max_workers=4):
+        """Answer many independent questions: parallel retrieval, then batched generation."""
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            prepared = list(pool.map(lambda q: self._prepare(q, None, top_k, rerank), queries))
+
+        pending = [i for i, p in enumerate(prepared) if p[0] is None]
+        generated = dict(zip(pending, self._generate([prepared[i][2] for i in pending]))) if pending else {}
+
+        results = []
+        for i, (answer, ctx, _, stats) in enumerate(prepared):
+            if answer is not None:
+                results.append(self._result(answer, ctx, None, True))
+            else:
+                results.append(self._result(generated[i], ctx, stats, False))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ask the Institute JSON RAG engine from the command line.")
+    parser.add_argument("questions", nargs="+")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--rerank", action="store_true")
+    parser.add_argument("--reingest", action="store_true", help="drop and rebuild the collection first")
+    args = parser.parse_args()
+
+    rag = InstituteRAG()
+    if args.reingest:
+        rag.ingest(force=True)
+    for q, res in zip(args.questions, rag.batch_answer(args.questions, top_k=args.top_k, rerank=args.rerank)):
+        print(f"Q: {q}\nA: {res['answer']}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Offline retrieval quality + latency benchmark for the Institute JSON RAG app.
+
+Runs headless (no Streamlit). Each configuration gets its own in-memory
+Chroma collection built from RAG/data, is scored against a question set
+with gold chunk ids (recall@k, MRR) and timed for embedding, retrieval,
+prompt building and, optionally, generation.
+
+    python evaluate.py
+    python evaluate.py --top-k 1 3 6 --alpha 0.0 0.5 1.0 --chunk-tokens 128 256
+    python evaluate.py --rerank --generate --out eval/reports
+
+A question counts a retrieved chunk as relevant if its id equals a gold id
+or is a sub-chunk of it ("<gold>-part-N").
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import chromadb
+
+from rag_core import (
+    BASE_DIR, CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, DATA_DIR, EMBED_MODEL_NAME, HYBRID_ALPHA,
+    build_bm25_index, build_prompt, hybrid_retrieve, ingest, make_chunk_tokenizer,
+    make_embedding_function, make_generator, make_reranker, normalize_query, open_collection,
+)
+
+QUESTIONS_PATH = os.path.join(BASE_DIR, "eval", "questions.json")
+
+
+def load_questions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_relevant(chunk_id, gold_ids):
+    return any(chunk_id == g or chunk_id.startswith(f"{g}-part-") for g in gold_ids)
+
+
+def recall_at_k(retrieved, gold_ids, k):
+    found = {g for g in gold_ids if any(is_relevant(r, [g]) for r in retrieved[:k])}
+    return len(found) / len(gold_ids)
+
+
+def reciprocal_rank(retrieved, gold_ids):
+    for rank, chunk_id in enumerate(retrieved, start=1):
+        if is_relevant(chunk_id, gold_ids):
+            return 1.0 / rank
+    return 0.0
+
+
+def latency_summary(samples_ms):
+    if not samples_ms:
+        return None
+    ordered = sorted(samples_ms)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": round(pick(0.50), 2),
+        "p95": round(pick(0.95), 2),
+    }
+
+
+def build_index(client, embed_model, chunk_tokens, data_dir):
+    """Ingest data_dir into a fresh in-memory collection for one (model, chunking) pair."""
+    name = "eval-" + hashlib.sha1(f"{embed_model}|{chunk_tokens}".encode()).hexdigest()[:12]
+    ef = make_embedding_function(embed_model)
+    collection = open_collection(client, name, ef, embed_model)
+    t0 = time.perf_counter()
+    ingest(collection, data_dir, tokenizer=make_chunk_tokenizer(embed_model),
+           max_tokens=chunk_tokens, overlap=min(CHUNK_OVERLAP_TOKENS, chunk_tokens // 4))
+    ingest_s = time.perf_counter() - t0
+    return collection, ef, build_bm25_index(collection), ingest_s
+
+
+def evaluate_config(questions, collection, ef, bm25, top_ks, alpha, reranker, generator):
+    max_k = max(top_ks)
+    recalls = {k: [] for k in top_ks}
+    rrs = []
+    timings = {"embed": [], "retrieve": [], "prompt": [], "generate": []}
+    tokenizer = generator.tokenizer if generator else None
+
+    for item in questions:
+        q, gold = item["question"], item["gold_ids"]
+
+        t0 = time.perf_counter()
+        q_emb = ef([normalize_query(q)])[0]  # same key the engine embeds
+        t1 = time.perf_counter()
+        ranked = hybrid_retrieve(q, q_emb, collection, bm25, top_k=max_k, alpha=alpha, reranker=reranker)
+        t2 = time.perf_counter()
+        ctx = [(bm25.docs[i], bm25.metas[i]) for i in ranked]
+        prompt, _ = build_prompt([], q, ctx, tokenizer=tokenizer)
+        t3 = time.perf_counter()
+        timings["embed"].append((t1 - t0) * 1000)
+        timings["retrieve"].append((t2 - t1) * 1000)
+        timings["prompt"].append((t3 - t2) * 1000)
+        if generator:
+            generator(prompt, max_length=250, truncation=True)
+            timings["generate"].append((time.perf_counter() - t3) * 1000)
+
+        retrieved = [bm25.ids[i] for i in ranked]
+        for k in top_ks:
+            recalls[k].append(recall_at_k(retrieved, gold, k))
+        rrs.append(reciprocal_rank(retrieved, gold))
+
+    n = len(questions)
+    return {
+        "recall": {f"@{k}": round(sum(v) / n, 4) for k, v in recalls.items()},
+        "mrr": round(sum(rrs) / n, 4),
+        "latency_ms": {name: latency_summary(v) for name, v in timings.items() if v},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", default=QUESTIONS_PATH)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--embed-model", nargs="+", default=[EMBED_MODEL_NAME])
+    parser.add_argument("--chunk-tokens", nargs="+", type=int, default=[CHUNK_TOKENS])
+    parser.add_argument("--alpha", nargs="+", type=float, default=[HYBRID_ALPHA],
+                        help="vector weight in fusion (1.0 = vector only, 0.0 = BM25 only)")
+    parser.add_argument("--top-k", nargs="+", type=int, default=[1, 3, 6])
+    parser.add_argument("--rerank", action="store_true", help="also evaluate with the cross-encoder reranker")
+    parser.add_argument("--generate", action="store_true", help="also time flan-t5 generation")
+    parser.add_argument("--out", help="directory to write one JSON report per configuration")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    client = chromadb.EphemeralClient()
+    reranker = make_reranker() if args.rerank else None
+    generator = make_generator() if args.generate else None
+    rerank_options = [False, True] if args.rerank else [False]
+
+    reports = []
+    for embed_model, chunk_tokens in itertools.product(args.embed_model, args.chunk_tokens):
+        collection, ef, bm25, ingest_s = build_index(client, embed_model, chunk_tokens, args.data_dir)
+        for alpha, rerank in itertools.product(args.alpha, rerank_options):
+            config = {
+                "embed_model": embed_model,
+                "chunk_tokens": chunk_tokens,
+                "alpha": alpha,
+                "rerank": rerank,
+                "chunks": len(bm25.ids),
+                "ingest_s": round(ingest_s, 2),
+            }
+            result = evaluate_config(questions, collection, ef, bm25, args.top_k, alpha,
+                                     reranker if rerank else None, generator)
+            reports.append({"config": config, "questions": len(questions), **result})
+
+    cols = ["embed_model", "chunk_tokens", "alpha", "rerank"]
+    print(" | ".join(cols + [f"recall@{k}" for k in args.top_k] + ["mrr", "retrieve_p50_ms"]))
+    for r in reports:
+        row = [str(r["config"][c]) for c in cols]
+        row += [str(r["recall"][f"@{k}"]) for k in args.top_k]
+        row += [str(r["mrr"]), str(r["latency_ms"]["retrieve"]["p50"])]
+        print(" | ".join(row))
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for r in reports:
+            c = r["config"]
+            slug = f"{c['embed_model'].replace('/', '_')}-c{c['chunk_tokens']}-a{c['alpha']}-r{int(c['rerank'])}"
+            with open(os.path.join(args.out, f"{slug}.json"), "w", encoding="utf-8") as f:
+                json.dump(r, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
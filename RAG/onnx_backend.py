@@ -0,0 +1,205 @@
+"""
+ONNX Runtime inference backend for the Institute JSON RAG app.
+
+Exports the generator (google/flan-t5-small) and the embedder
+(all-mpnet-base-v2) to ONNX, applies int8 dynamic quantization and runs
+both through ONNX Runtime on CPU with configurable thread counts.
+
+Setup (inside your virtual environment):
+
+    pip install "optimum[onnxruntime]"
+
+Export + quantize once (also done lazily on first load):
+
+    python onnx_backend.py export
+
+Check the quantized models against the PyTorch ones:
+
+    python onnx_backend.py validate
+
+Use it from the app:
+
+    RAG_BACKEND=onnx RAG_ORT_THREADS=4 streamlit run app.py
+"""
+
+import os
+import sys
+import shutil
+
+import numpy as np
+from transformers import AutoTokenizer, pipeline
+from chromadb.api.types import Documents, EmbeddingFunction
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ONNX_DIR = os.path.join(BASE_DIR, "onnx_models")
+GEN_MODEL_NAME = "google/flan-t5-small"
+EMBED_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+
+# Minimum cosine similarity between PyTorch and ONNX sentence embeddings
+EMBED_COSINE_THRESHOLD = 0.99
+# Minimum share of sample prompts where ONNX and PyTorch generate the same text
+GEN_EXACT_MATCH_THRESHOLD = 0.5
+
+SAMPLE_TEXTS = [
+    "Course Name: Master of Computer Applications\nCourse Code: MCA-301\nFees: ₹95,000 per year",
+    "Name: Rajat Kumar\nEnrollment No: SITM-CS-24-057\nFees Pending: ₹35,000",
+    "institute_name: Green Valley College of Engineering & Research",
+    "What are the fees for the BBA course?",
+]
+SAMPLE_PROMPTS = [
+    "Answer the question. Context: Course Code: MCA-301, Fees: ₹95,000 per year. Question: What are the MCA fees?",
+    "Answer the question. Context: Location: Pune, Maharashtra, India. Question: Where is the institute?",
+]
+
+
+# -------------------------------------------------------------------
+# Export + quantization
+# -------------------------------------------------------------------
+def model_dir(model_name, quantized=True):
+    return os.path.join(ONNX_DIR, model_name.replace("/", "__"), "int8" if quantized else "fp32")
+
+
+def quantize_dir(src, dst):
+    """Dynamic int8 quantization of every .onnx file in src; other files are copied."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(dst, exist_ok=True)
+    for fname in os.listdir(src):
+        path = os.path.join(src, fname)
+        if fname.endswith(".onnx"):
+            quantize_dynamic(path, os.path.join(dst, fname), weight_type=QuantType.QInt8)
+        elif os.path.isfile(path) and not fname.endswith(".onnx_data"):
+            shutil.copy2(path, os.path.join(dst, fname))
+
+
+def export_model(model_name, ort_cls, quantized=True):
+    """Export model_name to ONNX (and int8) under ONNX_DIR once; return the dir to load."""
+    fp32_dir = model_dir(model_name, quantized=False)
+    if not os.path.exists(os.path.join(fp32_dir, "config.json")):
+        print(f"Exporting {model_name} to ONNX ...")
+        model = ort_cls.from_pretrained(model_name, export=True)
+        model.save_pretrained(fp32_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(fp32_dir)
+    if not quantized:
+        return fp32_dir
+
+    int8_dir = model_dir(model_name, quantized=True)
+    if not os.path.exists(os.path.join(int8_dir, "config.json")):
+        print(f"Quantizing {model_name} to int8 ...")
+        quantize_dir(fp32_dir, int8_dir)
+    return int8_dir
+
+
+def make_session_options(num_threads=None):
+    import onnxruntime as ort
+
+    so = ort.SessionOptions()
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        so.intra_op_num_threads = num_threads
+        so.inter_op_num_threads = 1
+    return so
+
+
+# -------------------------------------------------------------------
+# Generator + embedder
+# -------------------------------------------------------------------
+def load_onnx_generator(num_threads=None, quantized=True):
+    """flan-t5-small as a text2text-generation pipeline backed by ONNX Runtime."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    path = export_model(GEN_MODEL_NAME, ORTModelForSeq2SeqLM, quantized)
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        path,
+        session_options=make_session_options(num_threads),
+        provider="CPUExecutionProvider",
+    )
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    return pipeline("text2text-generation", model=model, tokenizer=tokenizer)
+
+
+class OnnxEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Chroma embedding function running all-mpnet-base-v2 through ONNX Runtime.
+
+    Mirrors the sentence-transformers model: mean pooling over the attention
+    mask followed by L2 normalization.
+    """
+
+    def __init__(self, model_name=EMBED_MODEL_NAME, num_threads=None, quantized=True, batch_size=32, max_length=384):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+
+        if "/" not in model_name:
+            model_name = f"sentence-transformers/{model_name}"
+        path = export_model(model_name, ORTModelForFeatureExtraction, quantized)
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            path,
+            session_options=make_session_options(num_threads),
+            provider="CPUExecutionProvider",
+        )
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    def __call__(self, input: Documents):
+        out = []
+        for start in range(0, len(input), self.batch_size):
+            batch = list(input[start:start + self.batch_size])
+            enc = self.tokenizer(
+                batch, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+            )
+            hidden = self.model(
+                input_ids=enc["input_ids"], attention_mask=enc["attention_mask"]
+            ).last_hidden_state
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            out.extend(pooled.astype(np.float32).tolist())
+        return out
+
+
+# -------------------------------------------------------------------
+# Validation against PyTorch
+# -------------------------------------------------------------------
+def validate(num_threads=None, quantized=True):
+    """Compare ONNX outputs with the PyTorch models on the sample texts/prompts."""
+    from sentence_transformers import SentenceTransformer
+
+    torch_emb = SentenceTransformer(EMBED_MODEL_NAME, device="cpu").encode(
+        SAMPLE_TEXTS, normalize_embeddings=True
+    )
+    onnx_emb = np.asarray(OnnxEmbeddingFunction(num_threads=num_threads, quantized=quantized)(SAMPLE_TEXTS))
+    cosines = (torch_emb * onnx_emb).sum(axis=1)
+
+    torch_gen = pipeline("text2text-generation", model=GEN_MODEL_NAME, device=-1)
+    onnx_gen = load_onnx_generator(num_threads, quantized)
+    same = 0
+    for prompt in SAMPLE_PROMPTS:
+        a = torch_gen(prompt, max_length=64)[0]["generated_text"].strip()
+        b = onnx_gen(prompt, max_length=64)[0]["generated_text"].strip()
+        same += a == b
+        print(f"torch: {a!r}\nonnx : {b!r}\n")
+
+    report = {
+        "embedding_min_cosine": float(cosines.min()),
+        "embedding_mean_cosine": float(cosines.mean()),
+        "generation_exact_match": same / len(SAMPLE_PROMPTS),
+        "embedding_passed": bool(cosines.min() >= EMBED_COSINE_THRESHOLD),
+        "generation_passed": same / len(SAMPLE_PROMPTS) >= GEN_EXACT_MATCH_THRESHOLD,
+    }
+    report["passed"] = report["embedding_passed"] and report["generation_passed"]
+    print(report)
+    return report
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "export"
+    if cmd == "export":
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTModelForSeq2SeqLM
+
+        export_model(GEN_MODEL_NAME, ORTModelForSeq2SeqLM)
+        export_model(EMBED_MODEL_NAME, ORTModelForFeatureExtraction)
+    elif cmd == "validate":
+        sys.exit(0 if validate()["passed"] else 1)
+    else:
+        print("Usage: python onnx_backend.py [export|validate]")
@@ -0,0 +1,671 @@
+"""
+Headless core of the Institute JSON RAG app.
+
+Everything here runs without Streamlit: streaming JSON ingestion,
+structure-aware chunking, BM25 + vector hybrid retrieval, the structured
+field index and token-budgeted prompt assembly. app.py wires these into
+the UI and evaluate.py uses them for offline benchmarks.
+"""
+
+import os
+import json
+import math
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import ijson
+from chromadb.utils import embedding_functions
+from transformers import AutoTokenizer, pipeline
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Config
+# ---------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+CHROMA_DIR = os.path.join(BASE_DIR, "chroma_db")
+COLLECTION_NAME = "institute_json_collection"
+INGEST_BATCH_SIZE = 64
+EMBED_MODEL_NAME = "all-mpnet-base-v2"
+GEN_MODEL_NAME = "google/flan-t5-small"
+CHUNK_TOKENS = 256        # all-mpnet-base-v2 reads at most 384 tokens
+CHUNK_OVERLAP_TOKENS = 32
+QUERY_EMBED_CACHE_SIZE = 1024
+QUERY_RESULT_CACHE_SIZE = 256
+RERANK_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+CANDIDATE_K = 10       # candidates pulled from each retriever before fusion
+HYBRID_ALPHA = 0.5     # weight of the vector score in the fused score
+MAX_INPUT_TOKENS = 512 # flan-t5-small encoder input limit
+INFERENCE_BACKEND = os.getenv("RAG_BACKEND", "torch")  # "torch" or "onnx" (see onnx_backend.py)
+ORT_THREADS = int(os.getenv("RAG_ORT_THREADS", "0")) or None
+# Bump when loading/chunking changes what ingest() stores; older collections are rebuilt
+INGEST_SCHEMA_VERSION = 2
+
+# ---------------------------
+# Helpers: stream JSON files
+# ---------------------------
+LIST_KEYS = ("courses", "students")
+SCALAR_EVENTS = ("string", "number", "boolean", "null")
+
+def iter_json_files(data_dir):
+    for fname in sorted(os.listdir(data_dir)):
+        if fname.lower().endswith(".json"):
+            yield fname, os.path.join(data_dir, fname)
+
+def stream_json_items(path):
+    """
+    Incrementally parse one institute JSON file and yield (key, index, value).
+
+    Elements of the "courses"/"students" lists are yielded one at a time with
+    their list index; every other top-level key is yielded as a single block
+    with index None. Only the item being built is ever held in memory.
+    """
+    with open(path, "rb") as f:
+        key, index, target, builder = None, 0, None, None
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == target and event in ("end_map", "end_array"):
+                    yield key, (index if key in LIST_KEYS else None), builder.value
+                    builder = None
+                    index += 1
+                continue
+
+            if prefix == "" and event == "map_key":
+                key, index = value, 0
+                target = f"{key}.item" if key in LIST_KEYS else key
+                continue
+
+            if key is None or prefix != target:
+                continue
+            if event in ("start_map", "start_array"):
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif event in SCALAR_EVENTS:
+                yield key, (index if key in LIST_KEYS else None), value
+                index += 1
+
+# ---------------------------
+# Helpers: convert course/student/institute info -> readable text
+# ---------------------------
+def course_to_text(course):
+    parts = [
+        f"Course Name: {course.get('name','')}",
+        f"Course Code: {course.get('code','')}",
+        f"Duration: {course.get('duration','')}",
+        f"Semesters: {course.get('semesters','')}",
+        f"Eligibility: {course.get('eligibility','')}",
+        f"Fees: {course.get('fees','')}",
+        f"Total Seats: {course.get('total_seats','')}",
+    ]
+    return "\n".join([p for p in parts if p])
+
+def student_to_text(student):
+    parts = [
+        f"Name: {student.get('name','')}",
+        f"Enrollment No: {student.get('enrollment_no','')}",
+        f"Course: {student.get('course','')}",
+        f"Year: {student.get('year','')}",
+        f"Contact: {student.get('contact','')}",
+        f"Fees Paid: {student.get('fees_paid','')}",
+        f"Fees Pending: {student.get('fees_pending','')}",
+    ]
+    return "\n".join([p for p in parts if p])
+
+def generic_item_to_text(item):
+    if isinstance(item, dict):
+        lines = []
+        for k, v in item.items():
+            if isinstance(v, (list, dict)):
+                lines.append(f"{k}: {json.dumps(v, ensure_ascii=False)}")
+            else:
+                lines.append(f"{k}: {v}")
+        return "\n".join(lines)
+    else:
+        return str(item)
+
+# ---------------------------
+# Token helpers
+# ---------------------------
+def make_token_counter(tokenizer=None):
+    if tokenizer is None:
+        return lambda text: len(text.split())
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+def truncate_to_tokens(text, n, tokenizer=None):
+    if tokenizer is None:
+        return " ".join(text.split()[:n])
+    ids = tokenizer.encode(text, add_special_tokens=False)[:n]
+    return tokenizer.decode(ids, skip_special_tokens=True)
+
+def window_tokens(text, tokenizer=None, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP_TOKENS):
+    if tokenizer is None:
+        units, join = text.split(), " ".join
+    else:
+        units = tokenizer.encode(text, add_special_tokens=False)
+        join = lambda ids: tokenizer.decode(ids, skip_special_tokens=True)
+    step = max(1, max_tokens - overlap)
+    for start in range(0, len(units), step):
+        yield join(units[start:start + max_tokens])
+        if start + max_tokens >= len(units):
+            break
+
+# ---------------------------
+# Structure-aware chunking
+# ---------------------------
+def render_block(path, value):
+    if isinstance(value, dict):
+        return "\n".join([f"{path}:"] + [generic_item_to_text({k: v}) for k, v in value.items()])
+    return generic_item_to_text({path: value})
+
+def split_lines(text, tokenizer=None, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP_TOKENS):
+    """Pack whole "key: value" lines into chunks, carrying trailing lines as overlap."""
+    count = make_token_counter(tokenizer)
+    chunk, used = [], 0
+    for line in text.split("\n"):
+        n = count(line)
+        if n > max_tokens:
+            if chunk:
+                yield "\n".join(chunk)
+                chunk, used = [], 0
+            yield from window_tokens(line, tokenizer, max_tokens, overlap)
+            continue
+        if chunk and used + n > max_tokens:
+            yield "\n".join(chunk)
+            carry, carried = [], 0
+            for prev in reversed(chunk):
+                m = count(prev)
+                if carried + m > overlap:
+                    break
+                carry.insert(0, prev)
+                carried += m
+            chunk, used = carry, carried
+        chunk.append(line)
+        used += n
+    if chunk:
+        yield "\n".join(chunk)
+
+def split_structure(path, value, tokenizer=None, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP_TOKENS):
+    """
+    Yield (path, text) pieces of a JSON value no larger than max_tokens.
+
+    Dicts and lists are split on their keys/elements; small siblings are
+    packed together and oversized ones are split recursively. Scalars that
+    are still too long fall back to line/token windows with overlap.
+    """
+    count = make_token_counter(tokenizer)
+    text = render_block(path, value)
+    if count(text) <= max_tokens:
+        yield path, text
+        return
+    if isinstance(value, dict):
+        children = [(f"{path}.{k}", v) for k, v in value.items()]
+    elif isinstance(value, list):
+        children = [(f"{path}[{i}]", v) for i, v in enumerate(value)]
+    else:
+        for piece in split_lines(text, tokenizer, max_tokens, overlap):
+            yield path, piece
+        return
+
+    group, group_path, used = [], None, 0
+    for child_path, child in children:
+        child_text = render_block(child_path, child)
+        n = count(child_text)
+        if group and (n > max_tokens or used + n > max_tokens):
+            yield group_path, "\n".join(group)
+            group, group_path, used = [], None, 0
+        if n > max_tokens:
+            yield from split_structure(child_path, child, tokenizer, max_tokens, overlap)
+            continue
+        group.append(child_text)
+        group_path = group_path or child_path
+        used += n
+    if group:
+        yield group_path, "\n".join(group)
+
+# ---------------------------
+# Ingestion pipeline: items -> chunks -> batched add
+# ---------------------------
+def iter_item_docs(data_dir):
+    for fname, path in iter_json_files(data_dir):
+        base = os.path.splitext(fname)[0]
+        try:
+            for key, i, value in stream_json_items(path):
+                if key == "courses" and isinstance(value, dict):
+                    yield course_to_text(value), {"source": fname, "type":"course", "item_index":i}, f"{base}-course-{i}", value
+                elif key == "students" and isinstance(value, dict):
+                    yield student_to_text(value), {"source": fname, "type":"student", "item_index":i}, f"{base}-student-{i}", value
+                elif key not in LIST_KEYS:
+                    yield generic_item_to_text({key:value}), {"source": fname, "type":"key_block", "key":key}, f"{base}-key-{key}", value
+        except Exception as e:
+            logger.error(f"Error reading {fname}: {e}")
+
+def chunk_docs(items, tokenizer=None, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP_TOKENS):
+    """Split oversized docs on their structure and drop chunks whose text was already seen."""
+    count = make_token_counter(tokenizer)
+    seen = set()
+    for doc, meta, id_, value in items:
+        if count(doc) <= max_tokens:
+            pieces = [(None, doc)]
+        elif meta["type"] == "key_block":
+            pieces = list(split_structure(meta["key"], value, tokenizer, max_tokens, overlap))
+        else:
+            pieces = [(None, p) for p in split_lines(doc, tokenizer, max_tokens, overlap)]
+
+        for j, (path, text) in enumerate(pieces):
+            digest = hashlib.sha1(" ".join(text.split()).encode("utf-8")).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            if len(pieces) == 1:
+                yield text, meta, id_
+                continue
+            nm = meta.copy()
+            nm["subchunk"] = j
+            if path:
+                nm["path"] = path
+            yield text, nm, f"{id_}-part-{j}"
+
+def add_in_batches(collection, items, batch_size=INGEST_BATCH_SIZE):
+    docs, metas, ids = [], [], []
+    for doc, meta, id_ in items:
+        docs.append(doc)
+        metas.append(meta)
+        ids.append(id_)
+        if len(ids) >= batch_size:
+            collection.add(documents=docs, metadatas=metas, ids=ids)
+            docs, metas, ids = [], [], []
+    if ids:
+        collection.add(documents=docs, metadatas=metas, ids=ids)
+
+# ---------------------------
+# Query caches
+# ---------------------------
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class QueryCache:
+    """
+    Query embeddings keyed by normalized question text, plus top-k results
+    keyed by (collection version, question, top_k, rerank). Bumping the version on
+    ingestion makes every cached result stale without touching embeddings.
+    """
+    def __init__(self):
+        self.embeddings = LRUCache(QUERY_EMBED_CACHE_SIZE)
+        self.results = LRUCache(QUERY_RESULT_CACHE_SIZE)
+        self.version = 0
+
+    def invalidate(self):
+        self.version += 1
+        self.results.clear()
+
+def normalize_query(query):
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+# ---------------------------
+# Models + collection
+# ---------------------------
+def make_embedding_function(model_name=EMBED_MODEL_NAME, backend=INFERENCE_BACKEND, num_threads=ORT_THREADS):
+    if backend == "onnx":
+        from onnx_backend import OnnxEmbeddingFunction
+        return OnnxEmbeddingFunction(model_name=model_name, num_threads=num_threads)
+    return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+
+def make_chunk_tokenizer(model_name=EMBED_MODEL_NAME):
+    if "/" not in model_name:
+        model_name = f"sentence-transformers/{model_name}"
+    return AutoTokenizer.from_pretrained(model_name)
+
+def make_generator(model_name=GEN_MODEL_NAME, backend=INFERENCE_BACKEND, num_threads=ORT_THREADS):
+    if backend == "onnx":
+        from onnx_backend import load_onnx_generator
+        return load_onnx_generator(num_threads=num_threads)
+    return pipeline("text2text-generation", model=model_name, device=-1)
+
+def make_reranker(model_name=RERANK_MODEL_NAME):
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, device="cpu")
+
+def collection_metadata(model_name=EMBED_MODEL_NAME, backend=INFERENCE_BACKEND):
+    """Stamped on the collection so vectors are never mixed across embedders or chunkers."""
+    return {"embed_backend": backend, "embed_model": model_name, "ingest_schema": INGEST_SCHEMA_VERSION}
+
+def open_collection(client, name, ef, model_name=EMBED_MODEL_NAME, backend=INFERENCE_BACKEND):
+    """
+    Open (or create) the collection for this embedder. A collection built by
+    another backend/model or ingest schema, or one whose ingest never
+    finished, is dropped and recreated empty so ingest() refills it.
+    """
+    expected = collection_metadata(model_name, backend)
+    try:
+        collection = client.get_collection(name=name, embedding_function=ef)
+    except Exception:
+        return client.create_collection(name=name, embedding_function=ef, metadata=expected)
+    metadata = collection.metadata or {}
+    found = {key: metadata.get(key) for key in expected}
+    if found == expected and metadata.get("ingest_complete"):
+        return collection
+    if found == expected and collection.count() == 0:
+        return collection  # created but not ingested yet
+    if found == expected:
+        logger.warning(f"Collection {name} holds a partial ingest; re-ingesting")
+    else:
+        logger.warning(f"Collection {name} was built with {found}, expected {expected}; re-ingesting")
+    client.delete_collection(name)
+    return client.create_collection(name=name, embedding_function=ef, metadata=expected)
+
+def ingest(collection, data_dir=DATA_DIR, tokenizer=None, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP_TOKENS):
+    """
+    Stream data_dir into the collection; returns True if anything was added.
+    The collection is flagged ingest_complete only after the last batch, so a
+    crash mid-ingest leaves it unflagged and open_collection() rebuilds it.
+    """
+    metadata = collection.metadata or {}
+    if metadata.get("ingest_complete"):
+        return False
+    stale = collection.get(include=[])["ids"]
+    if stale:  # rows from an interrupted ingest
+        collection.delete(ids=stale)
+    add_in_batches(collection, chunk_docs(iter_item_docs(data_dir), tokenizer, max_tokens, overlap))
+    collection.modify(metadata={**metadata, "ingest_complete": True})
+    return True
+
+def build_bm25_index(collection):
+    data = collection.get(include=["documents", "metadatas"])
+    return BM25Index(data["ids"], data["documents"], data["metadatas"])
+
+# ---------------------------
+# Keyword index (BM25) + hybrid retrieval
+# ---------------------------
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-/][a-z0-9]+)*")
+
+def tokenize(text):
+    # Keep identifiers like "bcsc-101" whole and also index their parts
+    tokens = []
+    for tok in TOKEN_RE.findall(text.lower()):
+        tokens.append(tok)
+        if "-" in tok or "/" in tok:
+            tokens.extend(re.split(r"[-/]", tok))
+    return tokens
+
+class BM25Index:
+    """In-memory inverted index over the collection's chunks (Okapi BM25)."""
+    def __init__(self, ids, docs, metas, k1=1.5, b=0.75):
+        self.ids, self.docs, self.metas = ids, docs, metas
+        self.id_to_pos = {id_: i for i, id_ in enumerate(ids)}
+        self.k1, self.b = k1, b
+        self.postings = {}
+        self.doc_len = []
+        for i, doc in enumerate(docs):
+            tokens = tokenize(doc)
+            self.doc_len.append(len(tokens))
+            tf = {}
+            for tok in tokens:
+                tf[tok] = tf.get(tok, 0) + 1
+            for tok, count in tf.items():
+                self.postings.setdefault(tok, []).append((i, count))
+        self.avg_len = (sum(self.doc_len) / len(self.doc_len)) if self.doc_len else 0.0
+        n = len(docs)
+        self.idf = {
+            tok: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for tok, plist in self.postings.items()
+        }
+
+    def search(self, query, k):
+        scores = {}
+        for tok in set(tokenize(query)):
+            idf = self.idf.get(tok)
+            if idf is None:
+                continue
+            for i, tf in self.postings[tok]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[i] / (self.avg_len or 1))
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+
+def _min_max(scores):
+    if not scores:
+        return {}
+    lo, hi = min(scores.values()), max(scores.values())
+    if hi == lo:
+        return {k: 1.0 for k in scores}
+    return {k: (v - lo) / (hi - lo) for k, v in scores.items()}
+
+def fuse_scores(vector_hits, keyword_hits, bm25, alpha=HYBRID_ALPHA):
+    """
+    Combine vector hits [(id, distance)] and keyword hits [(pos, score)] into
+    one ranking of chunk positions using min-max normalized weighted scores.
+    """
+    vec = {bm25.id_to_pos[id_]: -dist for id_, dist in vector_hits if id_ in bm25.id_to_pos}
+    vec = _min_max(vec)
+    kw = _min_max(dict(keyword_hits))
+    fused = {i: alpha * vec.get(i, 0.0) + (1 - alpha) * kw.get(i, 0.0) for i in set(vec) | set(kw)}
+    return sorted(fused, key=fused.get, reverse=True)
+
+def rerank_candidates(query, ranked, bm25, reranker):
+    if reranker is None or not ranked:
+        return ranked
+    scores = reranker.predict([(query, bm25.docs[i]) for i in ranked])
+    order = sorted(range(len(ranked)), key=lambda j: scores[j], reverse=True)
+    return [ranked[j] for j in order]
+
+def hybrid_retrieve(query, query_embedding, collection, bm25, top_k=3, alpha=HYBRID_ALPHA,
+                    reranker=None, candidate_k=CANDIDATE_K):
+    """Return the positions (into bm25.ids/docs/metas) of the top_k fused chunks."""
+    n = min(candidate_k, len(bm25.ids))
+    if n == 0:
+        return []
+    res = collection.query(query_embeddings=[query_embedding], n_results=n, include=["distances"])
+    vector_hits = list(zip(res.get("ids", [[]])[0], res.get("distances", [[]])[0]))
+    keyword_hits = bm25.search(query, n)
+
+    ranked = fuse_scores(vector_hits, keyword_hits, bm25, alpha)
+    if reranker is not None:
+        ranked = rerank_candidates(query, ranked, bm25, reranker)
+    return ranked[:top_k]
+
+# ---------------------------
+# Structured field index for exact questions
+# ---------------------------
+MAX_NGRAM = 6
+
+# (field, label, trigger words) — checked in order, first match wins
+COURSE_FIELDS = [
+    ("fees", "Fees", ("fee", "fees", "cost", "price")),
+    ("total_seats", "Total Seats", ("seat", "seats", "intake", "capacity")),
+    ("semesters", "Semesters", ("semester", "semesters")),
+    ("duration", "Duration", ("duration", "long", "years")),
+    ("eligibility", "Eligibility", ("eligibility", "eligible", "qualification", "criteria")),
+]
+STUDENT_FIELDS = [
+    ("fees_pending", "Fees Pending", ("pending", "due", "balance", "outstanding", "remaining")),
+    ("fees_paid", "Fees Paid", ("paid",)),
+    ("enrollment_no", "Enrollment No", ("enrollment", "enrolment", "roll")),
+    ("contact", "Contact", ("contact", "phone", "mobile")),
+    ("course", "Course", ("course", "program", "programme", "studying")),
+    ("year", "Year", ("year",)),
+]
+
+def normalize_key(text):
+    return " ".join(TOKEN_RE.findall(str(text).lower()))
+
+def query_keys(query):
+    words = TOKEN_RE.findall(query.lower())
+    keys = set(tokenize(query))
+    for n in range(2, MAX_NGRAM + 1):
+        for i in range(len(words) - n + 1):
+            keys.add(" ".join(words[i:i + n]))
+    return keys
+
+class FieldIndex:
+    """
+    Exact-match lookup tables over the raw course/student records:
+    course code, code prefix and name -> course; student name and
+    enrollment number -> student. Each entry keeps the chunk metadata so a
+    direct answer can still show its source.
+    """
+    def __init__(self):
+        self.courses = {}
+        self.students = {}
+
+    def _add(self, table, keys, entry):
+        for key in keys:
+            if key:
+                bucket = table.setdefault(key, [])
+                if entry not in bucket:
+                    bucket.append(entry)
+
+    def add_course(self, course, meta):
+        code = normalize_key(course.get("code", ""))
+        name = str(course.get("name", ""))
+        keys = {code, re.split(r"[-/ ]", code)[0], normalize_key(name), normalize_key(re.sub(r"\(.*?\)", "", name))}
+        self._add(self.courses, keys, (course, meta))
+
+    def add_student(self, student, meta):
+        keys = {normalize_key(student.get("name", "")), normalize_key(student.get("enrollment_no", ""))}
+        self._add(self.students, keys, (student, meta))
+
+    def _match(self, table, keys):
+        found = []
+        for key in keys:
+            for entry in table.get(key, []):
+                if entry not in found:
+                    found.append(entry)
+        return found
+
+    def lookup(self, query):
+        """Return (answer, context) for an exact field question, else None."""
+        keys = query_keys(query)
+        for table, fields, to_text, title_key in (
+            (self.students, STUDENT_FIELDS, student_to_text, "name"),
+            (self.courses, COURSE_FIELDS, course_to_text, "name"),
+        ):
+            matches = self._match(table, keys)
+            if not matches:
+                continue
+            wanted = [(f, label) for f, label, words in fields if keys.intersection(words)]
+            if not wanted and table is self.students and keys.intersection(("fee", "fees")):
+                wanted = [("fees_paid", "Fees Paid"), ("fees_pending", "Fees Pending")]
+            if not wanted:
+                return None
+            if table is self.courses:
+                wanted = wanted[:1]
+            lines = []
+            for record, meta in matches:
+                values = ", ".join(f"{label}: {record.get(f, '')}" for f, label in wanted)
+                lines.append(f"{record.get(title_key, '')} ({meta.get('source')}) — {values}")
+            return "\n".join(lines), [(to_text(record), meta) for record, meta in matches]
+        return None
+
+def build_field_index(data_dir):
+    index = FieldIndex()
+    for fname, path in iter_json_files(data_dir):
+        try:
+            for key, i, value in stream_json_items(path):
+                if not isinstance(value, dict):
+                    continue
+                if key == "courses":
+                    index.add_course(value, {"source": fname, "type":"course", "item_index":i})
+                elif key == "students":
+                    index.add_student(value, {"source": fname, "type":"student", "item_index":i})
+        except Exception as e:
+            logger.error(f"Error indexing {fname}: {e}")
+    return index
+
+# ---------------------------
+# Prompt
+# ---------------------------
+def build_prompt(history, user_q, context, tokenizer=None, max_tokens=MAX_INPUT_TOKENS):
+    """
+    Assemble the prompt within max_tokens of the generator's tokenizer.
+
+    The instructions and the question are always kept (a question too long
+    to fit is truncated so the closing "Bot:" survives); chunks are added in
+    rank order while they fit (the first one that doesn't is truncated),
+    then the most recent history turns fill what is left, stopping at the
+    first turn that doesn't fit. Returns (prompt, stats) where stats
+    reports tokens used and dropped.
+    """
+    count = make_token_counter(tokenizer)
+    header = [
+        "You are an Institute QA Assistant. Answer ONLY using the context below.",
+        "If the answer cannot be found in the provided context, reply exactly: \"I don't know from this text.\"",
+        "",
+        "CONTEXT:"
+    ]
+    budget = max_tokens - 1  # room for </s>
+    budget -= sum(count(line) for line in header) + count("CONVERSATION:")
+    budget -= count("User:") + count("Bot:")
+    dropped = 0
+
+    need_q = count(user_q)
+    if need_q > budget:
+        user_q = truncate_to_tokens(user_q, max(budget, 0), tokenizer)
+        dropped += need_q - count(user_q)
+    budget -= count(f"User: {user_q}") - count("User:")
+    budget = max(budget, 0)
+    tail = [f"User: {user_q}", "Bot:"]
+
+    chunk_lines = []
+    for i, (doc, meta) in enumerate(context, start=1):
+        label = f"[Chunk {i}] (Source: {meta.get('source')}, type: {meta.get('type')}, index: {meta.get('item_index')})"
+        need_label, need_doc = count(label), count(doc)
+        if need_label + need_doc <= budget:
+            chunk_lines += [label, doc, ""]
+            budget -= need_label + need_doc
+        elif budget - need_label >= 32:
+            kept = budget - need_label
+            chunk_lines += [label, truncate_to_tokens(doc, kept, tokenizer), ""]
+            dropped += need_doc - kept
+            budget = 0
+        else:
+            dropped += need_label + need_doc
+
+    # Newest turns first; once one doesn't fit, older ones are dropped too so
+    # the kept history stays contiguous
+    history_lines = []
+    turns = [f"{'User' if msg['role'] == 'user' else 'Bot'}: {msg['text']}" for msg in history]
+    for pos in range(len(turns) - 1, -1, -1):
+        need = count(turns[pos])
+        if need > budget:
+            dropped += sum(count(line) for line in turns[:pos + 1])
+            break
+        history_lines.insert(0, turns[pos])
+        budget -= need
+
+    lines = header + chunk_lines + ["CONVERSATION:"] + history_lines + tail
+    prompt = "\n".join(lines)
+    stats = {
+        "tokens": max_tokens - 1 - budget,
+        "dropped": dropped,
+        "chunks_kept": sum(1 for line in chunk_lines if line.startswith("[Chunk ")),
+        "history_kept": len(history_lines),
+    }
+    return prompt, stats
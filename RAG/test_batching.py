@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from batching import BatchScheduler
+
+
+def make_scheduler(generate_fn, **kwargs):
+    kwargs.setdefault("max_batch_size", 4)
+    kwargs.setdefault("max_wait_ms", 50)
+    return BatchScheduler(generate_fn, **kwargs)
+
+
+def test_results_follow_prompt_order():
+    sched = make_scheduler(lambda prompts: [p.upper() for p in prompts])
+    try:
+        assert sched.generate_many(["a", "b", "c"], timeout=5) == ["A", "B", "C"]
+        assert sched.batches >= 1
+        assert sched.requests == 3
+    finally:
+        sched.close()
+
+
+def test_generate_error_fails_every_future():
+    def boom(prompts):
+        raise ValueError("model crashed")
+
+    sched = make_scheduler(boom)
+    try:
+        futures = [sched.submit(p) for p in ("a", "b")]
+        for fut in futures:
+            with pytest.raises(ValueError, match="model crashed"):
+                fut.result(timeout=5)
+    finally:
+        sched.close()
+
+
+def test_short_output_fails_every_future():
+    sched = make_scheduler(lambda prompts: prompts[:1])
+    try:
+        futures = [sched.submit(p) for p in ("a", "b", "c")]
+        for fut in futures:
+            with pytest.raises(RuntimeError, match="outputs for"):
+                fut.result(timeout=5)
+    finally:
+        sched.close()
+
+
+def test_concurrent_callers_are_batched():
+    sizes = []
+    gate = threading.Barrier(4)
+
+    def generate(prompts):
+        sizes.append(len(prompts))
+        return prompts
+
+    sched = make_scheduler(generate, max_wait_ms=200)
+    results = {}
+
+    def worker(i):
+        gate.wait()
+        results[i] = sched.generate(f"p{i}", timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sched.close()
+    assert results == {i: f"p{i}" for i in range(4)}
+    assert max(sizes) > 1
@@ -0,0 +1,90 @@
+import itertools
+import json
+
+import chromadb
+import pytest
+from chromadb.api.types import Documents, EmbeddingFunction
+
+import rag_core
+from rag_core import INGEST_BATCH_SIZE, build_prompt, ingest, open_collection
+
+
+def turn(role, words):
+    return {"role": role, "text": " ".join([role] * words)}
+
+
+def test_chunks_and_history_fit_under_budget():
+    context = [("alpha beta gamma", {"source": "a.json", "type": "faq", "item_index": 0})]
+    history = [turn("user", 3), turn("bot", 3)]
+    prompt, stats = build_prompt(history, "what is alpha?", context, max_tokens=200)
+    assert stats["chunks_kept"] == 1
+    assert stats["history_kept"] == 2
+    assert stats["dropped"] == 0
+    assert stats["tokens"] <= 199
+    assert prompt.endswith("User: what is alpha?\nBot:")
+
+
+def test_history_stops_at_first_turn_that_does_not_fit():
+    # Oldest turn is short, middle one is long, newest is short
+    history = [turn("user", 2), turn("bot", 50), turn("user", 2)]
+    _, base = build_prompt([], "q", [], max_tokens=200)
+    # Leave room for 10 tokens of history
+    prompt, stats = build_prompt(history, "q", [], max_tokens=base["tokens"] + 1 + 10)
+    # Only the newest turn is kept; the short oldest one is not spliced in
+    assert stats["history_kept"] == 1
+    assert stats["dropped"] == 51 + 3
+    assert "CONVERSATION:\nUser: user user\nUser: q\nBot:" in prompt
+
+
+def test_long_question_is_truncated_and_tail_kept():
+    question = " ".join(f"w{i}" for i in range(500))
+    prompt, stats = build_prompt([turn("user", 5)], question, [], max_tokens=100)
+    assert prompt.endswith("Bot:")
+    assert "User: w0 w1" in prompt
+    assert stats["tokens"] <= 99
+    assert stats["history_kept"] == 0
+    assert stats["dropped"] > 0
+
+
+class FakeEmbedding(EmbeddingFunction[Documents]):
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return [[1.0, float(len(text)), 0.0] for text in input]
+
+
+def write_courses(tmp_path, n=150):
+    data = {"institute_name": "Green Valley", "courses": [{"name": f"c{i}", "fees": i} for i in range(n)]}
+    (tmp_path / "institute.json").write_text(json.dumps(data))
+    return str(tmp_path)
+
+
+def test_interrupted_ingest_is_rebuilt(tmp_path, monkeypatch):
+    data_dir = write_courses(tmp_path)
+    client = chromadb.EphemeralClient()
+    name = f"ingest-{tmp_path.name}"
+    collection = open_collection(client, name, FakeEmbedding(), "m", "torch")
+
+    def crash_after_first_batch(collection, items, batch_size=INGEST_BATCH_SIZE):
+        first = list(itertools.islice(items, 3))
+        collection.add(documents=[d for d, _, _ in first], metadatas=[m for _, m, _ in first],
+                       ids=[i for _, _, i in first])
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(rag_core, "add_in_batches", crash_after_first_batch)
+    with pytest.raises(KeyboardInterrupt):
+        ingest(collection, data_dir)
+    monkeypatch.undo()
+
+    # Next start: the partial collection is dropped and fully re-ingested
+    collection = open_collection(client, name, FakeEmbedding(), "m", "torch")
+    assert collection.count() == 0
+    assert ingest(collection, data_dir) is True
+    full = collection.count()
+    assert full > 3
+    assert collection.metadata["ingest_complete"] is True
+
+    collection = open_collection(client, name, FakeEmbedding(), "m", "torch")
+    assert ingest(collection, data_dir) is False
+    assert collection.count() == full
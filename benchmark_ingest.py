@@ -0,0 +1,62 @@
+import argparse
+import os
+import tempfile
+import time
+
+from embedders import make_embedder
+from semantic_store import connect, upsert_documents
+
+# -----------------------------------
+# Benchmark: semantic store ingest throughput
+# -----------------------------------
+#   python benchmark_ingest.py --docs 2000
+#
+# Three passes over the same corpus: a cold ingest (everything encoded and
+# inserted), a re-run (everything skipped by hash) and a run where
+# --change-ratio of the documents were edited.
+
+
+def make_docs(n, version=0, change_every=None):
+    docs = []
+    for i in range(n):
+        edited = change_every and i % change_every == 0
+        text = (f"Document {i} describes student {i % 97} in club {i % 13} "
+                f"at campus {i % 3}, revision {version if edited else 0}.")
+        docs.append((f"doc_{i}", text))
+    return docs
+
+
+def timed_upsert(conn, model, docs):
+    t0 = time.perf_counter()
+    counts = upsert_documents(conn, model, docs)
+    return time.perf_counter() - t0, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic store ingest benchmark")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--change-ratio", type=float, default=0.1)
+    parser.add_argument("--embedder", default="sentence-transformers", choices=["sentence-transformers", "hashing"])
+    args = parser.parse_args()
+
+    model = make_embedder(args.embedder)
+    change_every = max(1, round(1 / args.change_ratio)) if args.change_ratio else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, "bench.db"), dim=model.dim)
+
+        passes = [
+            ("cold", make_docs(args.docs)),
+            ("unchanged", make_docs(args.docs)),
+            ("edited", make_docs(args.docs, version=1, change_every=change_every)),
+        ]
+        print("pass | seconds | docs_per_s | inserted | updated | skipped")
+        for name, docs in passes:
+            seconds, counts = timed_upsert(conn, model, docs)
+            print(f"{name} | {seconds:.2f} | {len(docs) / seconds:.0f} | "
+                  f"{counts['inserted']} | {counts['updated']} | {counts['skipped']}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from semantic_store import EMBED_DIM, connect, search
+
+# -----------------------------------
+# Benchmark: KNN latency as the document count grows
+# -----------------------------------
+#   python benchmark_knn.py
+#   python benchmark_knn.py --sizes 1000 10000 100000 --queries 50
+#
+# Compares the old approach (a distance computed in SQL for every BLOB row,
+# then ORDER BY) with the vec0 table, unquantized and with int8 / binary
+# quantization + float rescoring. recall@k is measured against the exact
+# float results.
+
+
+def random_unit(n, rng):
+    v = rng.standard_normal((n, EMBED_DIM), dtype=np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def fill(conn, vectors):
+    """Bulk-load synthetic documents straight into both layouts."""
+    with conn:
+        conn.executemany(
+            "INSERT INTO documents (id, title, content, content_hash) VALUES (?, ?, '', '')",
+            [(i + 1, f"doc_{i}") for i in range(len(vectors))],
+        )
+        conn.execute("CREATE TABLE blob_docs (id INTEGER PRIMARY KEY, embedding BLOB)")
+        conn.executemany("INSERT INTO blob_docs VALUES (?, ?)",
+                         [(i + 1, v.tobytes()) for i, v in enumerate(vectors)])
+
+
+def blob_scan(conn, query, k):
+    return conn.execute("""
+    SELECT d.title, d.content, vec_distance_cosine(b.embedding, ?) AS distance
+    FROM blob_docs b JOIN documents d ON d.id = b.id
+    ORDER BY distance LIMIT ?
+    """, (query.tobytes(), k)).fetchall()
+
+
+def measure(fn, queries, k):
+    results, latencies = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append([r[0] for r in fn(q, k)])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+    return results, latencies[len(latencies) // 2]
+
+
+def recall(found, truth, k):
+    return sum(len(set(f) & set(t)) for f, t in zip(found, truth)) / (k * len(truth))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sqlite-vec KNN latency benchmark")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print("docs | method | p50_ms | recall@k")
+    for n in args.sizes:
+        vectors = random_unit(n, rng)
+        queries = random_unit(args.queries, rng)
+        truth = None
+        for quantization in (None, "int8", "bit"):
+            with tempfile.TemporaryDirectory() as tmp:
+                conn = connect(os.path.join(tmp, "bench.db"), quantization=quantization)
+                fill(conn, vectors)
+                # Load the vec0 table from the BLOBs in SQL (same as student.py's migration)
+                with conn:
+                    conn.execute("UPDATE documents SET embedding = (SELECT embedding FROM blob_docs b WHERE b.id = documents.id)")
+                conn.close()
+                conn = connect(os.path.join(tmp, "bench.db"), quantization=quantization)
+
+                if truth is None:
+                    truth, ms = measure(lambda q, k: blob_scan(conn, q, k), queries, args.k)
+                    print(f"{n} | blob scan | {ms:.2f} | 1.000")
+                found, ms = measure(lambda q, k: search(conn, q, k), queries, args.k)
+                print(f"{n} | vec0 {quantization or 'float'} | {ms:.2f} | {recall(found, truth, args.k):.3f}")
+                conn.close()
+
+
+if __name__ == "__main__":
+    main()
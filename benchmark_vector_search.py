@@ -0,0 +1,72 @@
+import argparse
+import time
+
+import numpy as np
+from numpy.linalg import norm
+
+from vector_search import VectorIndex
+
+# -----------------------------------
+# Benchmark: per-row cosine loop vs. VectorIndex
+# -----------------------------------
+#   python benchmark_vector_search.py
+#   python benchmark_vector_search.py --sizes 10000 100000 --batch 64
+#
+# "loop" is the original sqllite.py approach (np.frombuffer + two norms per
+# row, then a full Python sort). It is skipped above --loop-max rows.
+
+DIM = 384
+
+
+def loop_search(rows, query_blob, k):
+    q = np.frombuffer(query_blob, dtype=np.float32)
+    scores = []
+    for book_id, title, emb in rows:
+        v = np.frombuffer(emb, dtype=np.float32)
+        scores.append((book_id, title, float(np.dot(q, v) / (norm(q) * norm(v) + 1e-10))))
+    scores.sort(key=lambda x: x[2], reverse=True)
+    return scores[:k]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Top-k cosine search benchmark")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=32, help="queries per batched search")
+    parser.add_argument("--loop-max", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print("rows | loop_ms | index_build_ms | single_ms | batched_ms_per_query | same_top_k")
+    for n in args.sizes:
+        vectors = rng.standard_normal((n, DIM), dtype=np.float32)
+        queries = rng.standard_normal((args.batch, DIM), dtype=np.float32)
+        rows = [(i, f"doc {i}", vectors[i].tobytes()) for i in range(n)]
+
+        build_ms, index = timed(lambda: VectorIndex.from_rows(rows, DIM), 1)
+        single_ms, hits = timed(lambda: index.search(queries[0], args.k), args.repeat)
+        batch_ms, _ = timed(lambda: index.search_batch(queries, args.k), args.repeat)
+
+        loop_ms, same = "-", "-"
+        if n <= args.loop_max:
+            loop_ms, expected = timed(lambda: loop_search(rows, queries[0].tobytes(), args.k), 1)
+            same = [h[0] for h in hits] == [e[0] for e in expected]
+            loop_ms = f"{loop_ms:.1f}"
+
+        print(f"{n} | {loop_ms} | {build_ms:.1f} | {single_ms:.2f} | "
+              f"{batch_ms / args.batch:.2f} | {same}")
+        del rows, vectors, index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import re
+
+import numpy as np
+
+
+# -----------------------------------
+# Pluggable text embedders (used by sqllite.py and student.py)
+# -----------------------------------
+# Every embedder has a `name`, a `dim` and
+#     encode(texts, batch_size) -> float32 array [len(texts), dim]
+# so both vector stores share one batch encode path.
+#
+# - SentenceTransformerEmbedder: real model (all-MiniLM-L6-v2 by default)
+# - HashingEmbedder: deterministic hashing-trick vectors, no model download;
+#   for tests and offline demos
+# - CachedEmbedder: wraps either one with an SQLite cache keyed by
+#   (embedder name, sha256 of the text); only misses reach the model
+#
+# make_embedder() picks one from the EMBEDDER env var
+# ("sentence-transformers" or "hashing").
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_DIM = 384
+ENCODE_BATCH_SIZE = 64
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name=DEFAULT_MODEL):
+        self.name = model_name
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.name)
+        return self._model
+
+    @property
+    def dim(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size=ENCODE_BATCH_SIZE):
+        vectors = self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class HashingEmbedder:
+    """
+    Bag of words + character trigrams hashed into `dim` signed buckets and
+    L2-normalized. Same text -> same vector on every run and machine; texts
+    sharing words end up close, which is enough to exercise search code.
+    """
+
+    def __init__(self, dim=DEFAULT_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        words = _TOKEN_RE.findall(text.lower())
+        for word in words:
+            yield word
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3]
+
+    def encode(self, texts, batch_size=ENCODE_BATCH_SIZE):
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-10)
+
+
+class CachedEmbedder:
+    """Embedding cache in an SQLite table, keyed by embedder name + text hash."""
+
+    def __init__(self, embedder, conn):
+        self.embedder = embedder
+        self.conn = conn
+        self.name = embedder.name
+        self.hits = 0
+        self.misses = 0
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            model TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            PRIMARY KEY (model, text_hash)
+        );
+        """)
+        conn.commit()
+
+    @property
+    def dim(self):
+        return self.embedder.dim
+
+    def encode(self, texts, batch_size=ENCODE_BATCH_SIZE):
+        texts = list(texts)
+        hashes = [text_hash(t) for t in texts]
+        cached = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), 500):  # stay under SQLite's variable limit
+            chunk = unique[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            cached.update(
+                (h, np.frombuffer(blob, dtype=np.float32))
+                for h, blob in self.conn.execute(
+                    f"SELECT text_hash, embedding FROM embedding_cache WHERE model = ? AND text_hash IN ({marks})",
+                    [self.name, *chunk],
+                )
+            )
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached:
+                missing.setdefault(h, t)
+        self.hits += len(texts) - sum(1 for h in hashes if h in missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.embedder.encode(list(missing.values()), batch_size=batch_size)
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (model, text_hash, embedding) VALUES (?, ?, ?)",
+                    [(self.name, h, v.tobytes()) for h, v in zip(missing, vectors)],
+                )
+            cached.update(zip(missing, vectors))
+
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.stack([cached[h] for h in hashes]).astype(np.float32, copy=False)
+
+
+def make_embedder(kind=None, conn=None, dim=DEFAULT_DIM):
+    """Embedder from EMBEDDER (default sentence-transformers), cached in conn if given."""
+    kind = kind or os.environ.get("EMBEDDER", "sentence-transformers")
+    if kind == "hashing":
+        embedder = HashingEmbedder(dim)
+    elif kind == "sentence-transformers":
+        embedder = SentenceTransformerEmbedder(os.environ.get("EMBEDDER_MODEL", DEFAULT_MODEL))
+    else:
+        raise ValueError(f"Unknown embedder {kind!r}; use 'sentence-transformers' or 'hashing'")
+    return CachedEmbedder(embedder, conn) if conn is not None else embedder
@@ -0,0 +1,226 @@
+import os
+import sqlite3
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from vector_search import EPS, top_k
+
+
+# -----------------------------------
+# Memory-mapped embedding store
+# -----------------------------------
+# Vectors live in a raw float32 file (<name>.f32, row-major [rows, dim]);
+# SQLite (<name>.db) keeps only the metadata: id, title, offset (row in the
+# vector file) and the row norm. Searches score a read-only np.memmap of the
+# file block by block, so nothing is copied out of SQLite per query.
+#
+# - append: vectors are written at the end of the file, then the metadata
+#   rows are committed in one transaction; a partial row left by a crashed
+#   write is cut off first (on open and before every append)
+# - delete: removes metadata only; the vector row becomes dead space
+# - compact: rewrites the live rows into a new file and updates offsets
+
+BLOCK_ROWS = 262_144  # rows scored per block (~400 MB at dim=384)
+
+
+class MmapEmbeddingStore:
+    def __init__(self, path, dim=384):
+        """path is the file prefix: <path>.f32 holds vectors, <path>.db metadata."""
+        self.dim = dim
+        self.vec_path = path + ".f32"
+        self.conn = sqlite3.connect(path + ".db")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS books_vectors_meta (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            offset INTEGER NOT NULL UNIQUE,
+            norm REAL NOT NULL
+        );
+        """)
+        self.conn.commit()
+        if not os.path.exists(self.vec_path):
+            open(self.vec_path, "wb").close()
+        self._view = None
+        self._trim_torn_row()
+
+    # -----------------------------------
+    # Layout helpers
+    # -----------------------------------
+    @property
+    def file_rows(self):
+        """Rows in the vector file, including dead ones."""
+        return os.path.getsize(self.vec_path) // (4 * self.dim)
+
+    def _trim_torn_row(self):
+        """Cut a partially written trailing row so every row starts at offset * 4 * dim."""
+        whole = self.file_rows * 4 * self.dim
+        if os.path.getsize(self.vec_path) != whole:
+            with open(self.vec_path, "r+b") as f:
+                f.truncate(whole)
+                f.flush()
+                os.fsync(f.fileno())
+            self._view = None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM books_vectors_meta").fetchone()[0]
+
+    def dead_rows(self):
+        return self.file_rows - len(self)
+
+    def _load_view(self):
+        """(memmap, offsets, ids, titles, inv_norms, live), cached until the next write."""
+        if self._view is None:
+            rows = self.conn.execute(
+                "SELECT offset, id, title, norm FROM books_vectors_meta ORDER BY offset"
+            ).fetchall()
+            n = self.file_rows
+            matrix = (np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+                      if n else np.empty((0, self.dim), dtype=np.float32))
+            offsets = np.array([r[0] for r in rows], dtype=np.int64)
+            ids = np.array([r[1] for r in rows], dtype=np.int64)
+            titles = [r[2] for r in rows]
+            inv_norms = 1.0 / (np.array([r[3] for r in rows], dtype=np.float32) + EPS)
+            live = np.full(n, -1, dtype=np.int64)  # file row -> metadata position (-1 = dead)
+            live[offsets] = np.arange(len(offsets))
+            self._view = (matrix, offsets, ids, titles, inv_norms, live)
+        return self._view
+
+    def vector(self, book_id):
+        """Zero-copy view of one stored vector (None if the id is unknown)."""
+        row = self.conn.execute(
+            "SELECT offset FROM books_vectors_meta WHERE id = ?", (book_id,)
+        ).fetchone()
+        return None if row is None else self._load_view()[0][row[0]]
+
+    # -----------------------------------
+    # Writes
+    # -----------------------------------
+    def append(self, items):
+        """Add (id, title, vector) items; vectors go to the end of the file."""
+        items = list(items)
+        if not items:
+            return
+        vectors = np.ascontiguousarray([v for _, _, v in items], dtype=np.float32)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"expected {self.dim}-d vectors, got {vectors.shape[1]}")
+        self._trim_torn_row()
+        start = self.file_rows
+        norms = np.linalg.norm(vectors, axis=1)
+
+        with open(self.vec_path, "ab") as f:
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        # Metadata is committed only after the vectors are on disk; a crash in
+        # between just leaves unreferenced (dead) rows for compact() to drop.
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO books_vectors_meta (id, title, offset, norm) VALUES (?, ?, ?, ?)",
+                [(book_id, title, start + i, float(norms[i]))
+                 for i, (book_id, title, _) in enumerate(items)],
+            )
+        self._view = None
+
+    def delete(self, ids):
+        with self.conn:
+            self.conn.executemany("DELETE FROM books_vectors_meta WHERE id = ?", [(i,) for i in ids])
+        self._view = None
+
+    def compact(self):
+        """Rewrite live vectors contiguously (in offset order) and drop dead rows."""
+        matrix, offsets, ids, _, _, _ = self._load_view()
+        if len(offsets) == self.file_rows:
+            return 0
+        dropped = self.file_rows - len(offsets)
+        tmp_path = self.vec_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for start in range(0, len(offsets), BLOCK_ROWS):
+                f.write(np.ascontiguousarray(matrix[offsets[start:start + BLOCK_ROWS]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._view = None
+        del matrix
+        with self.conn:
+            # Two passes so the UNIQUE(offset) constraint never collides
+            self.conn.execute("UPDATE books_vectors_meta SET offset = -1 - offset")
+            self.conn.executemany(
+                "UPDATE books_vectors_meta SET offset = ? WHERE id = ?",
+                [(new, int(book_id)) for new, book_id in enumerate(ids)],
+            )
+            os.replace(tmp_path, self.vec_path)
+        return dropped
+
+    # -----------------------------------
+    # Search
+    # -----------------------------------
+    def search(self, query, k=2):
+        """Top-k [(id, title, cosine similarity)] over the live vectors."""
+        matrix, offsets, ids, titles, inv_norms, live = self._load_view()
+        if len(offsets) == 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).ravel()
+        query = query / (np.linalg.norm(query) + EPS)
+
+        best_pos, best_scores = [], []
+        for start in range(0, len(matrix), BLOCK_ROWS):
+            block_live = live[start:start + BLOCK_ROWS]
+            mask = block_live >= 0
+            scores = matrix[start:start + BLOCK_ROWS] @ query  # reads the mapped pages in place
+            meta = block_live[mask]
+            scores = scores[mask] * inv_norms[meta]
+            idx = top_k(scores, k)
+            best_pos.append(meta[idx])
+            best_scores.append(scores[idx])
+
+        pos = np.concatenate(best_pos)
+        scores = np.concatenate(best_scores)
+        order = top_k(scores, k)
+        return [(int(ids[pos[i]]), titles[pos[i]], float(scores[i])) for i in order]
+
+    def close(self):
+        self._view = None
+        self.conn.close()
+
+
+# -----------------------------------
+# Demo / benchmark
+# -----------------------------------
+#   python embedding_store.py --rows 1000000
+def main():
+    parser = argparse.ArgumentParser(description="Memory-mapped embedding store demo")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--delete-every", type=int, default=10, help="delete every Nth row before compacting")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MmapEmbeddingStore(os.path.join(tmp, "books"), dim=args.dim)
+
+        t0 = time.perf_counter()
+        for start in range(0, args.rows, 50_000):
+            n = min(50_000, args.rows - start)
+            vectors = rng.standard_normal((n, args.dim), dtype=np.float32)
+            store.append((start + i, f"Book {start + i}", vectors[i]) for i in range(n))
+        print(f"append {args.rows} rows: {time.perf_counter() - t0:.2f}s")
+
+        query = store.vector(42).copy()
+        store.search(query)  # load metadata + warm the page cache
+        t0 = time.perf_counter()
+        top = store.search(query)
+        print(f"search: {(time.perf_counter() - t0) * 1000:.1f} ms -> {top}")
+
+        store.delete(range(0, args.rows, args.delete_every))
+        t0 = time.perf_counter()
+        dropped = store.compact()
+        print(f"compact: dropped {dropped} rows in {time.perf_counter() - t0:.2f}s, "
+              f"{len(store)} live, {store.dead_rows()} dead")
+        print("after compact:", store.search(query))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Opt-in cache for chat completion replies.
+
+Key: sha256 of (model, messages, sampling params). Two tiers:
+- memory: LRU of the most recent replies (RESPONSE_CACHE_SIZE entries)
+- disk (optional): SQLite file at RESPONSE_CACHE_DB, entries expire after
+  RESPONSE_CACHE_TTL seconds; disk hits are promoted to memory
+
+RESPONSE_CACHE selects when replies are cached:
+- "off" (default): never
+- "deterministic": only requests with temperature 0
+- "on": every request (identical prompts get identical replies)
+
+"deterministic" caches nothing for an app that samples (ColourChat uses
+temperature 0.8, the ChatBot provider defaults), so those apps need "on";
+warn_if_unused() logs this at startup.
+
+Shared by Flask/APImodel.py and ChatBot/app.py, which put the repository
+root on sys.path to import it.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+MODES = ("off", "deterministic", "on")
+
+
+class ResponseCache:
+    def __init__(self, mode="off", max_entries=256, db_path=None, ttl=3600):
+        if mode not in MODES:
+            raise ValueError(f"RESPONSE_CACHE must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (reply, created)
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0}
+
+        self._db = None
+        if db_path and mode != "off":
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                reply TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+            """)
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            mode=os.getenv("RESPONSE_CACHE", "off"),
+            max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+            db_path=os.getenv("RESPONSE_CACHE_DB") or None,
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        )
+
+    @staticmethod
+    def make_key(model, messages, params):
+        payload = json.dumps([model, messages, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def applies(self, params):
+        """Should a request with these sampling params use the cache?"""
+        if self.mode == "on":
+            return True
+        return self.mode == "deterministic" and params.get("temperature") == 0
+
+    def warn_if_unused(self, params, logger):
+        """Log when the configured mode can never apply to these sampling params."""
+        if self.mode == "deterministic" and not self.applies(params):
+            logger.warning(
+                "RESPONSE_CACHE=deterministic caches nothing: sampling uses temperature %s. "
+                "Set RESPONSE_CACHE=on to cache anyway.", params.get("temperature", "default"))
+
+    def lookup(self, key):
+        """(reply, tier, age_seconds) on a hit, else None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[0], "memory", now - entry[1]
+            if entry:
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT reply, created FROM response_cache WHERE key = ? AND created > ?",
+                    (key, now - self.ttl),
+                ).fetchone()
+                if row:
+                    self._remember(key, row[0], row[1])
+                    self.stats["disk_hits"] += 1
+                    return row[0], "disk", now - row[1]
+
+            self.stats["misses"] += 1
+            return None
+
+    def store(self, key, reply):
+        now = time.time()
+        with self._lock:
+            self._remember(key, reply, now)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO response_cache (key, reply, created) VALUES (?, ?, ?)",
+                        (key, reply, now),
+                    )
+                    self._db.execute("DELETE FROM response_cache WHERE created <= ?", (now - self.ttl,))
+
+    def bypass(self):
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def _remember(self, key, reply, created):
+        self._memory[key] = (reply, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def snapshot(self):
+        """Stats + hit rate for the metrics endpoint."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        stats["mode"] = self.mode
+        return stats
+
+
+def cache_headers(hit):
+    """X-Cache / Age headers for a lookup result (None = miss)."""
+    if hit is None:
+        return {"X-Cache": "MISS"}
+    _, tier, age = hit
+    return {"X-Cache": f"HIT-{tier.upper()}", "Age": str(int(age))}
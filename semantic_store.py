@@ -0,0 +1,342 @@
+import hashlib
+import json
+import re
+import sqlite3
+
+import numpy as np
+
+
+# -----------------------------------
+# SQLite semantic store (used by student.py)
+# -----------------------------------
+# Documents are keyed by title and carry a sha256 of their content, so
+# ingestion is idempotent: re-running it skips unchanged documents, and only
+# new or changed texts are sent to the embedding model (in one batch) and
+# written (in one transaction).
+#
+# Vectors live in a sqlite-vec `vec0` virtual table (documents_vec, rowid =
+# documents.id) with a declared dimension, and KNN queries go through the
+# extension (`MATCH ... AND k = ?`) instead of computing a distance per row
+# in SQL. The dimension comes from the embedder (connect(dim=model.dim));
+# opening a store built for another dimension raises instead of failing on
+# the first insert. Optionally an int8 or binary quantized copy of each vector is
+# stored too: the coarse KNN runs on the small quantized column and the
+# top candidates are rescored with the exact float cosine distance.
+#
+# An FTS5 index (documents_fts, external content on documents) is kept in
+# sync by triggers. hybrid_search() fuses its BM25 ranking with the vector
+# KNN ranking (reciprocal rank fusion), optionally computing vector
+# distances only for the FTS5 candidates.
+
+EMBED_DIM = 384  # all-MiniLM-L6-v2
+ENCODE_BATCH_SIZE = 64
+QUANTIZATIONS = (None, "int8", "bit")
+RESCORE_OVERSAMPLE = 8  # quantized candidates fetched per requested result
+RRF_CANDIDATES = 20     # results taken from each retriever before fusion
+RRF_K = 60              # reciprocal rank fusion constant
+
+_TERM_RE = re.compile(r"\w+")
+
+
+def connect(path="semantic.db", quantization=None, dim=EMBED_DIM):
+    import sqlite_vec
+
+    conn = sqlite3.connect(path)
+    conn.enable_load_extension(True)
+    sqlite_vec.load(conn)
+    conn.enable_load_extension(False)
+    ensure_schema(conn, quantization, dim)
+    return conn
+
+
+def _quantize_sql(quantization):
+    """SQL expression turning a float32 blob parameter into the quantized column type."""
+    return {"int8": "vec_quantize_int8(?, 'unit')", "bit": "vec_quantize_binary(?)"}[quantization]
+
+
+def vec_quantization(conn):
+    """Quantization of the existing documents_vec table (None / "int8" / "bit")."""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'documents_vec'").fetchone()
+    if row is None:
+        return None
+    sql = row[0].lower()
+    return "int8" if "int8[" in sql else "bit" if "bit[" in sql else None
+
+
+def vec_dim(conn):
+    """Declared dimension of the existing documents_vec table (None if absent)."""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'documents_vec'").fetchone()
+    if row is None:
+        return None
+    match = re.search(r"float\[(\d+)\]", row[0].lower())
+    return int(match.group(1)) if match else None
+
+
+def _create_vec_table(conn, quantization, dim):
+    columns = [f"embedding float[{dim}] distance_metric=cosine"]
+    if quantization == "int8":
+        columns.append(f"embedding_q int8[{dim}]")
+    elif quantization == "bit":
+        columns.append(f"embedding_q bit[{dim}]")
+    conn.execute(f"CREATE VIRTUAL TABLE documents_vec USING vec0({', '.join(columns)})")
+
+
+def _insert_vectors(conn, rows, quantization):
+    """rows: (doc_id, float32 blob). vec0 has no upsert, so delete first."""
+    conn.executemany("DELETE FROM documents_vec WHERE rowid = ?", [(doc_id,) for doc_id, _ in rows])
+    if quantization:
+        conn.executemany(
+            f"INSERT INTO documents_vec (rowid, embedding, embedding_q) VALUES (?, ?, {_quantize_sql(quantization)})",
+            [(doc_id, blob, blob) for doc_id, blob in rows],
+        )
+    else:
+        conn.executemany("INSERT INTO documents_vec (rowid, embedding) VALUES (?, ?)", rows)
+
+
+def ensure_schema(conn, quantization=None, dim=EMBED_DIM):
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"quantization must be one of {QUANTIZATIONS}")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        content TEXT,
+        embedding BLOB,
+        content_hash TEXT
+    );
+    """)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+    with conn:
+        if "content_hash" not in columns:
+            # Older semantic.db files: add the hash column and drop the
+            # duplicates earlier runs inserted (keep the newest per title)
+            conn.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
+            conn.execute("""
+            DELETE FROM documents
+            WHERE id NOT IN (SELECT MAX(id) FROM documents GROUP BY title)
+            """)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS documents_title ON documents(title)")
+
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'documents_vec'").fetchone()
+        if exists and vec_dim(conn) != dim:
+            raise ValueError(
+                f"documents_vec stores {vec_dim(conn)}-dim vectors but the embedder produces "
+                f"{dim}; use a new database file or re-embed into a fresh one"
+            )
+        if exists and vec_quantization(conn) != quantization:
+            # Quantization changed: rebuild the vec0 table from its float vectors
+            rows = conn.execute("SELECT rowid, embedding FROM documents_vec").fetchall()
+            conn.execute("DROP TABLE documents_vec")
+            _create_vec_table(conn, quantization, dim)
+            _insert_vectors(conn, rows, quantization)
+        elif not exists:
+            _create_vec_table(conn, quantization, dim)
+
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'documents_fts'").fetchone():
+            conn.execute("""
+            CREATE VIRTUAL TABLE documents_fts
+            USING fts5(title, content, content='documents', content_rowid='id',
+                       tokenize='porter unicode61')
+            """)
+            conn.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+        for trigger in _FTS_TRIGGERS:
+            conn.execute(trigger)
+
+        # Vectors from before the vec0 table: move them over, free the BLOBs
+        legacy = conn.execute(
+            "SELECT id, embedding FROM documents WHERE embedding IS NOT NULL"
+        ).fetchall()
+        if legacy:
+            _insert_vectors(conn, legacy, quantization)
+            conn.execute("UPDATE documents SET embedding = NULL")
+
+
+_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts (documents_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE OF title, content ON documents BEGIN
+        INSERT INTO documents_fts (documents_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO documents_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+)
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def upsert_documents(conn, model, docs, batch_size=ENCODE_BATCH_SIZE):
+    """
+    Insert or update (title, content) documents; unchanged ones are skipped.
+    Returns {"inserted": n, "updated": n, "skipped": n}.
+    """
+    docs = list(dict(docs).items())  # last occurrence of a title wins
+    stored = {}
+    titles = [title for title, _ in docs]
+    for start in range(0, len(titles), 500):  # stay under SQLite's variable limit
+        chunk = titles[start:start + 500]
+        marks = ",".join("?" * len(chunk))
+        stored.update(conn.execute(
+            f"SELECT title, content_hash FROM documents WHERE title IN ({marks})", chunk
+        ))
+
+    changed = []
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+    for title, text in docs:
+        digest = content_hash(text)
+        if stored.get(title) == digest:
+            counts["skipped"] += 1
+            continue
+        counts["updated" if title in stored else "inserted"] += 1
+        changed.append((title, text, digest))
+
+    if not changed:
+        return counts
+
+    embeddings = model.encode([text for _, text, _ in changed], batch_size=batch_size)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO documents (title, content, content_hash)
+            VALUES (?, ?, ?)
+            ON CONFLICT(title) DO UPDATE SET
+                content = excluded.content,
+                content_hash = excluded.content_hash
+            """,
+            [(title, text, digest) for title, text, digest in changed],
+        )
+        ids = dict(conn.execute(
+            "SELECT title, id FROM documents WHERE title IN (SELECT value FROM json_each(?))",
+            (json.dumps([title for title, _, _ in changed]),),
+        ))
+        _insert_vectors(
+            conn,
+            [(ids[title], emb.tobytes()) for (title, _, _), emb in zip(changed, embeddings)],
+            vec_quantization(conn),
+        )
+    return counts
+
+
+def _knn_ids(conn, blob, k, oversample=RESCORE_OVERSAMPLE):
+    """[(doc_id, cosine distance)] for the k nearest vectors, nearest first."""
+    quantization = vec_quantization(conn)
+    if quantization is None:
+        return conn.execute("""
+        SELECT rowid, distance FROM documents_vec
+        WHERE embedding MATCH ? AND k = ?
+        ORDER BY distance
+        """, (blob, k)).fetchall()
+
+    return conn.execute(f"""
+    WITH coarse AS (
+        SELECT rowid FROM documents_vec
+        WHERE embedding_q MATCH {_quantize_sql(quantization)} AND k = ?
+    )
+    SELECT v.rowid, vec_distance_cosine(v.embedding, ?) AS distance
+    FROM coarse JOIN documents_vec v ON v.rowid = coarse.rowid
+    ORDER BY distance
+    LIMIT ?
+    """, (blob, k * oversample, blob, k)).fetchall()
+
+
+def _fetch_documents(conn, doc_ids):
+    """{doc_id: (title, content)} for the given ids."""
+    return {
+        doc_id: (title, content)
+        for doc_id, title, content in conn.execute(
+            "SELECT id, title, content FROM documents WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(doc_ids)),),
+        )
+    }
+
+
+def search(conn, query_vec, k=3, oversample=RESCORE_OVERSAMPLE):
+    """
+    KNN over documents_vec -> [(title, content, cosine distance)], nearest first.
+    With a quantized column, k * oversample candidates are fetched from it
+    and rescored with the exact float distance.
+    """
+    blob = np.asarray(query_vec, dtype=np.float32).tobytes()
+    hits = _knn_ids(conn, blob, k, oversample)
+    docs = _fetch_documents(conn, [doc_id for doc_id, _ in hits])
+    return [(*docs[doc_id], distance) for doc_id, distance in hits]
+
+
+# -----------------------------------
+# Full-text + hybrid retrieval
+# -----------------------------------
+def fts_query(text):
+    """Free text -> FTS5 MATCH expression (quoted terms OR-ed, so no syntax errors)."""
+    terms = dict.fromkeys(t.lower() for t in _TERM_RE.findall(text))
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+def fts_search(conn, text, k=RRF_CANDIDATES):
+    """[(doc_id, bm25)] best first (FTS5 bm25 is lower = better)."""
+    match = fts_query(text)
+    if not match:
+        return []
+    return conn.execute("""
+    SELECT rowid, bm25(documents_fts) AS score
+    FROM documents_fts
+    WHERE documents_fts MATCH ?
+    ORDER BY score
+    LIMIT ?
+    """, (match, k)).fetchall()
+
+
+def _vector_distances(conn, blob, doc_ids):
+    """Exact cosine distances for just these documents, nearest first."""
+    return conn.execute("""
+    SELECT rowid, vec_distance_cosine(embedding, ?) AS distance
+    FROM documents_vec
+    WHERE rowid IN (SELECT value FROM json_each(?))
+    ORDER BY distance
+    """, (blob, json.dumps(list(doc_ids)))).fetchall()
+
+
+def rrf_fuse(rankings, k, rrf_k=RRF_K):
+    """
+    Reciprocal rank fusion of ranked [(doc_id, score)] lists -> top-k
+    [(doc_id, rrf score)]. Only ranks matter; ties keep first-seen order.
+    """
+    scores = {}
+    for hits in rankings:
+        for rank, (doc_id, _) in enumerate(hits, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def hybrid_search(conn, text, query_vec, k=3, candidates=RRF_CANDIDATES,
+                  rrf_k=RRF_K, fts_filter=False):
+    """
+    Reciprocal rank fusion of FTS5 BM25 and vector KNN results
+    -> [(title, content, rrf score)], best first.
+
+    With fts_filter=True the vector side only scores the FTS5 candidates
+    (falls back to full KNN when the text matches nothing).
+    """
+    blob = np.asarray(query_vec, dtype=np.float32).tobytes()
+    keyword_hits = fts_search(conn, text, candidates)
+    if fts_filter and keyword_hits:
+        vector_hits = _vector_distances(conn, blob, [doc_id for doc_id, _ in keyword_hits])
+    else:
+        vector_hits = _knn_ids(conn, blob, candidates)
+
+    best = rrf_fuse([keyword_hits, vector_hits], k, rrf_k)
+    docs = _fetch_documents(conn, [doc_id for doc_id, _ in best])
+    return [(*docs[doc_id], score) for doc_id, score in best]
@@ -1,15 +1,7 @@
 import sqlite3
-import numpy as np
-from numpy.linalg import norm
 
-
-# -----------------------------------
-# Helper: Cosine similarity
-# -----------------------------------
-def cosine_similarity(v1, v2):
-    v1 = np.frombuffer(v1, dtype=np.float32)
-    v2 = np.frombuffer(v2, dtype=np.float32)
-    return np.dot(v1, v2) / (norm(v1) * norm(v2) + 1e-10)
+from embedders import make_embedder
+from vector_search import VectorIndex
 
 
 # -----------------------------------
@@ -27,51 +19,41 @@ CREATE TABLE books_vectors (
 
 
 # -----------------------------------
-# Fake embeddings
+# Embeddings (see embedders.py)
 # -----------------------------------
-def make_vec(value: float) -> bytes:
-    return np.array([value] * 384, dtype=np.float32).tobytes()
+# sentence-transformers by default; EMBEDDER=hashing runs without a model
+# download. Vectors are cached by text hash in embedding_cache.db, which
+# (unlike the in-memory table above) persists across runs.
+cache_conn = sqlite3.connect("embedding_cache.db")
+embedder = make_embedder(conn=cache_conn)
 
-
-book_data = [
-    (1, "Book 1: Intro to AI", make_vec(0.10)),
-    (2, "Book 2: Cooking with Love", make_vec(0.80)),
-    (3, "Book 3: Machine Learning", make_vec(0.14)),
+books = [
+    (1, "Book 1: Intro to AI"),
+    (2, "Book 2: Cooking with Love"),
+    (3, "Book 3: Machine Learning"),
 ]
+vectors = embedder.encode([title for _, title in books])  # one batch
+book_data = [(book_id, title, vec.tobytes()) for (book_id, title), vec in zip(books, vectors)]
 
 conn.executemany("INSERT INTO books_vectors (id, title, embedding) VALUES (?, ?, ?)", book_data)
 conn.commit()
 
 
-# -----------------------------------
-# Fake query embedding generator
-# -----------------------------------
-def fake_text_embedding(text: str) -> bytes:
-    return np.array([0.15] * 384, dtype=np.float32).tobytes()
-
-
 # -----------------------------------
 # Query
 # -----------------------------------
 query_text = input("Enter your search text: ")
-query_emb = fake_text_embedding(query_text)
-
-cursor = conn.execute("SELECT id, title, embedding FROM books_vectors")
-rows = cursor.fetchall()
+query_emb = embedder.encode([query_text])[0]
 
 # -----------------------------------
-# Compute similarity manually
+# Vectorized similarity (see vector_search.py)
 # -----------------------------------
-scores = []
-for row in rows:
-    book_id, title, emb = row
-    sim = cosine_similarity(query_emb, emb)
-    scores.append((book_id, title, float(sim)))
-
-# Sort descending by similarity
-scores.sort(key=lambda x: x[2], reverse=True)
+# Embeddings are loaded once into a float32 matrix with precomputed norms;
+# the query is scored against all rows in one matrix-vector product.
+index = VectorIndex.from_sqlite(conn, "books_vectors")
+top = index.search(query_emb, k=2)
 
 # Top-2 results
 print("\nTop-2 similar books:")
-for book_id, title, sim in scores[:2]:
+for book_id, title, sim in top:
     print(f"ID: {book_id} | Title: {title} | Similarity: {sim:.4f}")
\ No newline at end of file
@@ -1,23 +1,14 @@
-import sqlite3
-import sqlite_vec
-from sentence_transformers import SentenceTransformer
-
-# 1️⃣ Setup
-conn = sqlite3.connect("semantic.db")
-conn.enable_load_extension(True)
-sqlite_vec.load(conn)
-
-conn.execute("""
-CREATE TABLE IF NOT EXISTS documents (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    title TEXT,
-    content TEXT,
-    embedding BLOB
-);
-""")
-
-# 2️⃣ Model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+from embedders import CachedEmbedder, make_embedder
+from semantic_store import connect, hybrid_search, search, upsert_documents
+
+# 1️⃣ Model (shared with sqllite.py; EMBEDDER=hashing for offline runs,
+#    EMBEDDER_MODEL picks the sentence-transformers model)
+embedder = make_embedder()
+
+# 2️⃣ Setup (loads sqlite-vec, creates/migrates the documents table with the
+#    model's vector dimension); embeddings are cached by text hash in semantic.db
+conn = connect("semantic.db", dim=embedder.dim)
+model = CachedEmbedder(embedder, conn)
 
 # 3️⃣ Insert data
 data = [
@@ -37,26 +28,29 @@ data = [
     including one of the largest library systems in the world.""")
 ]
 
-for title, text in data:
-    embedding = model.encode(text)
-    conn.execute("INSERT INTO documents (title, content, embedding) VALUES (?, ?, ?)", 
-                 (title, text, embedding.tobytes()))
-
-conn.commit()
-print("✅ Data inserted successfully!")
+# Idempotent: unchanged documents are skipped, new/changed ones are encoded
+# in one batch and written in one transaction
+counts = upsert_documents(conn, model, data)
+print(f"✅ Data ingested: {counts['inserted']} inserted, {counts['updated']} updated, "
+      f"{counts['skipped']} unchanged")
 
 # 4️⃣ Query
 query = "Where does Alexandra study?"
-query_vec = model.encode(query)
+query_vec = model.encode([query])[0]
 
-cursor = conn.execute("""
-SELECT title, content, embedding <-> ? AS distance
-FROM documents
-ORDER BY distance ASC
-LIMIT 3
-""", (query_vec.tobytes(),))
+# KNN through the sqlite-vec vec0 index (see semantic_store.search)
+results = search(conn, query_vec, k=3)
 
 print("\n🔍 Query Results:")
-for row in cursor.fetchall():
+for row in results:
     print(f"Title: {row[0]}, Distance: {row[2]:.4f}")
     print(f"Excerpt: {row[1][:150]}...\n")
+
+# 5️⃣ Hybrid query: FTS5 keyword matches ("Alexandra") fused with vector KNN
+#    (reciprocal rank fusion); fts_filter only scores the FTS5 candidates
+hybrid = hybrid_search(conn, query, query_vec, k=3, fts_filter=True)
+
+print("🔀 Hybrid Results:")
+for row in hybrid:
+    print(f"Title: {row[0]}, RRF score: {row[2]:.4f}")
+    print(f"Excerpt: {row[1][:150]}...\n")
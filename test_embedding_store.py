@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+
+from embedding_store import MmapEmbeddingStore
+
+
+def make_store(tmp_path, rows=5, dim=4):
+    store = MmapEmbeddingStore(str(tmp_path / "books"), dim=dim)
+    store.append((i, f"Book {i}", np.eye(dim, dtype=np.float32)[i % dim] + i) for i in range(rows))
+    return store
+
+
+def test_append_after_torn_write_keeps_offsets_aligned(tmp_path):
+    store = make_store(tmp_path)
+    # Simulate a crash halfway through writing a row
+    with open(store.vec_path, "ab") as f:
+        f.write(b"\x00" * 6)
+    store.append([(99, "Late", np.array([0, 0, 5, 0], dtype=np.float32))])
+    assert store.file_rows == 6
+    np.testing.assert_array_equal(store.vector(99), [0, 0, 5, 0])
+    assert store.search([0, 0, 1, 0], k=1)[0][:2] == (99, "Late")
+    store.close()
+
+
+def test_reopen_trims_torn_row(tmp_path):
+    store = make_store(tmp_path)
+    store.close()
+    vec_path = str(tmp_path / "books.f32")
+    with open(vec_path, "ab") as f:
+        f.write(b"\x01" * 10)
+    store = MmapEmbeddingStore(str(tmp_path / "books"), dim=4)
+    assert os.path.getsize(vec_path) == 5 * 4 * 4
+    assert len(store) == 5 and store.dead_rows() == 0
+    store.close()
+
+
+def test_delete_and_compact(tmp_path):
+    store = make_store(tmp_path, rows=8)
+    before = {i: store.vector(i).copy() for i in range(8)}
+    store.delete([0, 3, 5])
+    assert store.dead_rows() == 3
+    assert store.compact() == 3
+    assert store.file_rows == 5
+    for i in (1, 2, 4, 6, 7):
+        np.testing.assert_array_equal(store.vector(i), before[i])
+    assert store.vector(3) is None
+    store.close()
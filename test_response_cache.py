@@ -0,0 +1,91 @@
+import logging
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, cache_headers
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return clock
+
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = ResponseCache(mode="on", max_entries=2)
+    cache.store("a", "A")
+    cache.store("b", "B")
+    assert cache.lookup("a")[:2] == ("A", "memory")  # a is now most recent
+    cache.store("c", "C")
+    assert cache.lookup("b") is None
+    assert cache.lookup("a")[0] == "A"
+    assert cache.lookup("c")[0] == "C"
+    assert cache.snapshot()["memory_entries"] == 2
+
+
+def test_memory_entries_expire_after_ttl(clock):
+    cache = ResponseCache(mode="on", ttl=10)
+    cache.store("k", "reply")
+    clock.now += 9
+    assert cache.lookup("k") == ("reply", "memory", 9)
+    clock.now += 2
+    assert cache.lookup("k") is None
+    assert cache.snapshot()["memory_entries"] == 0
+
+
+def test_disk_hit_is_promoted_to_memory(clock, tmp_path):
+    db = str(tmp_path / "cache.db")
+    ResponseCache(mode="on", db_path=db, ttl=60).store("k", "reply")
+
+    clock.now += 5
+    cache = ResponseCache(mode="on", db_path=db, ttl=60)  # fresh process, empty memory
+    assert cache.lookup("k") == ("reply", "disk", 5)
+    assert cache.lookup("k") == ("reply", "memory", 5)
+    stats = cache.snapshot()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+    assert stats["hit_rate"] == 1.0
+
+
+def test_expired_disk_entries_are_ignored(clock, tmp_path):
+    db = str(tmp_path / "cache.db")
+    ResponseCache(mode="on", db_path=db, ttl=60).store("k", "reply")
+    clock.now += 61
+    assert ResponseCache(mode="on", db_path=db, ttl=60).lookup("k") is None
+
+
+def test_modes():
+    sampled, greedy = {"temperature": 0.8}, {"temperature": 0}
+    assert not ResponseCache("off").applies(greedy)
+    assert ResponseCache("deterministic").applies(greedy)
+    assert not ResponseCache("deterministic").applies(sampled)
+    assert not ResponseCache("deterministic").applies({})
+    assert ResponseCache("on").applies(sampled)
+    with pytest.raises(ValueError):
+        ResponseCache("sometimes")
+
+
+def test_warn_if_unused(caplog):
+    logger = logging.getLogger("test_response_cache")
+    with caplog.at_level(logging.WARNING, logger="test_response_cache"):
+        ResponseCache("deterministic").warn_if_unused({"temperature": 0.8}, logger)
+        ResponseCache("deterministic").warn_if_unused({"temperature": 0}, logger)
+        ResponseCache("on").warn_if_unused({"temperature": 0.8}, logger)
+    assert len(caplog.records) == 1
+
+
+def test_key_depends_on_params_and_headers():
+    messages = [{"role": "user", "content": "hi"}]
+    assert ResponseCache.make_key("m", messages, {"temperature": 0}) != \
+        ResponseCache.make_key("m", messages, {"temperature": 1})
+    assert cache_headers(None) == {"X-Cache": "MISS"}
+    assert cache_headers(("r", "disk", 3.7)) == {"X-Cache": "HIT-DISK", "Age": "3"}
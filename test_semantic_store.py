@@ -0,0 +1,38 @@
+import sqlite3
+
+import pytest
+
+from semantic_store import RRF_K, connect, rrf_fuse, vec_dim
+
+
+def test_document_in_both_lists_wins():
+    keyword = [("a", 9.0), ("b", 5.0), ("c", 1.0)]
+    vector = [("b", 0.1), ("c", 0.2), ("d", 0.3)]
+    fused = rrf_fuse([keyword, vector], k=4)
+    assert [doc_id for doc_id, _ in fused] == ["b", "c", "a", "d"]
+    assert dict(fused)["b"] == 1 / (RRF_K + 2) + 1 / (RRF_K + 1)
+    assert dict(fused)["d"] == 1 / (RRF_K + 3)
+
+
+def test_only_ranks_matter():
+    a = rrf_fuse([[("x", 100.0), ("y", 1.0)], [("y", 0.9)]], k=2)
+    b = rrf_fuse([[("x", 0.01), ("y", 0.0)], [("y", 0.0)]], k=2)
+    assert a == b
+
+
+def test_ties_keep_first_seen_order_and_k_limits():
+    fused = rrf_fuse([[("a", 1.0)], [("b", 1.0)]], k=5, rrf_k=10)
+    assert fused == [("a", 1 / 11), ("b", 1 / 11)]
+    assert rrf_fuse([[("a", 1.0)], [("b", 1.0)]], k=1) == [("a", 1 / (RRF_K + 1))]
+    assert rrf_fuse([[], []], k=3) == []
+
+
+@pytest.mark.skipif(not hasattr(sqlite3.Connection, "enable_load_extension"),
+                    reason="this sqlite3 build cannot load sqlite-vec")
+def test_connect_rejects_store_built_for_another_dimension(tmp_path):
+    pytest.importorskip("sqlite_vec")
+    path = str(tmp_path / "semantic.db")
+    connect(path, dim=8).close()
+    assert vec_dim(connect(path, dim=8)) == 8
+    with pytest.raises(ValueError, match="8-dim"):
+        connect(path, dim=16)
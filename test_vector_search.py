@@ -0,0 +1,68 @@
+import sqlite3
+
+import numpy as np
+
+import vector_search
+from vector_search import VectorIndex, top_k
+
+
+def reference_top_k(vectors, query, k):
+    """Brute-force cosine ranking in float64."""
+    v = vectors.astype(np.float64)
+    q = query.astype(np.float64)
+    sims = (v @ q) / (np.linalg.norm(v, axis=1) * np.linalg.norm(q))
+    order = np.argsort(-sims, kind="stable")[:k]
+    return order, sims[order]
+
+
+def random_index(n=200, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return VectorIndex(np.arange(100, 100 + n), vectors, [f"t{i}" for i in range(n)]), rng
+
+
+def test_search_matches_numpy_reference():
+    index, rng = random_index()
+    for _ in range(10):
+        query = rng.standard_normal(index.dim).astype(np.float32)
+        order, sims = reference_top_k(index.vectors, query, 5)
+        results = index.search(query, k=5)
+        assert [r[0] for r in results] == [100 + i for i in order]
+        assert [r[1] for r in results] == [f"t{i}" for i in order]
+        np.testing.assert_allclose([r[2] for r in results], sims, rtol=1e-5, atol=1e-6)
+
+
+def test_search_batch_matches_reference_across_chunks(monkeypatch):
+    index, rng = random_index()
+    queries = rng.standard_normal((7, index.dim)).astype(np.float32)
+    # Force several chunks of queries
+    monkeypatch.setattr(vector_search, "SCORE_BUDGET", 2 * len(index))
+    positions, best = index.search_batch(queries, k=3)
+    for q, query in enumerate(queries):
+        order, sims = reference_top_k(index.vectors, query, 3)
+        assert positions[q].tolist() == order.tolist()
+        np.testing.assert_allclose(best[q], sims, rtol=1e-5, atol=1e-6)
+
+
+def test_k_larger_than_index():
+    index, rng = random_index(n=3)
+    results = index.search(rng.standard_normal(index.dim), k=10)
+    assert len(results) == 3
+    assert [r[2] for r in results] == sorted((r[2] for r in results), reverse=True)
+
+
+def test_top_k_ties_keep_lower_index_first():
+    scores = np.array([[0.5, 0.9, 0.5, 0.9, 0.1]])
+    assert top_k(scores, 3).tolist() == [[1, 3, 0]]
+
+
+def test_from_sqlite_roundtrip():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE books_vectors (id INTEGER PRIMARY KEY, title TEXT, embedding BLOB)")
+    vectors = np.eye(3, dtype=np.float32)
+    conn.executemany("INSERT INTO books_vectors VALUES (?, ?, ?)",
+                     [(i + 1, f"b{i}", v.tobytes()) for i, v in enumerate(vectors)])
+    index = VectorIndex.from_sqlite(conn)
+    [(id_, title, sim)] = index.search([0, 1, 0], k=1)
+    assert (id_, title) == (2, "b1")
+    assert abs(sim - 1.0) < 1e-6
@@ -0,0 +1,99 @@
+import numpy as np
+
+
+# -----------------------------------
+# Vectorized top-k cosine search
+# -----------------------------------
+# All embeddings live in one contiguous float32 matrix [n, dim] with the
+# row norms computed once at load time. A query is scored against every row
+# with a single matrix-vector product, and np.argpartition picks the top-k
+# without sorting the whole score array.
+
+EPS = 1e-10
+
+# Max score-matrix size (floats) per chunk of batched queries (~64 MB)
+SCORE_BUDGET = 16_000_000
+
+
+def top_k(scores, k):
+    """Indices of the k largest scores (last axis), best first."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    if k < scores.shape[-1]:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(k), scores.shape[:-1] + (k,))
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class VectorIndex:
+    """In-memory cosine-similarity index over a float32 embedding matrix."""
+
+    def __init__(self, ids, vectors, titles=None):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.vectors.ndim != 2:
+            raise ValueError("vectors must be a 2-D [n, dim] matrix")
+        self.ids = np.asarray(ids)
+        self.titles = list(titles) if titles is not None else None
+        # 1 / ||row||, so scoring is one product and one multiply
+        self.inv_norms = 1.0 / (np.linalg.norm(self.vectors, axis=1) + EPS)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    @classmethod
+    def from_rows(cls, rows, dim=None):
+        """Build from (id, title, embedding_blob) rows, copying each blob once."""
+        rows = list(rows)
+        if dim is None:
+            dim = len(rows[0][2]) // 4 if rows else 0
+        matrix = np.empty((len(rows), dim), dtype=np.float32)
+        for i, (_, _, blob) in enumerate(rows):
+            matrix[i] = np.frombuffer(blob, dtype=np.float32)
+        return cls([r[0] for r in rows], matrix, [r[1] for r in rows])
+
+    @classmethod
+    def from_sqlite(cls, conn, table="books_vectors"):
+        """Load every (id, title, embedding) row of an SQLite table."""
+        cursor = conn.execute(f"SELECT id, title, embedding FROM {table} ORDER BY id")
+        return cls.from_rows(cursor)
+
+    def scores(self, queries):
+        """Cosine similarity of each query [q, dim] against every row -> [q, n]."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        q_inv = 1.0 / (np.linalg.norm(queries, axis=1, keepdims=True) + EPS)
+        return (queries @ self.vectors.T) * q_inv * self.inv_norms
+
+    def search_batch(self, queries, k=2):
+        """
+        Top-k for many queries at once (matrix-matrix product).
+        Returns (positions [q, k], scores [q, k]); rows are processed in
+        chunks so the score matrix stays under SCORE_BUDGET floats.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, len(self))
+        positions = np.empty((len(queries), k), dtype=np.int64)
+        best = np.empty((len(queries), k), dtype=np.float32)
+        step = max(1, SCORE_BUDGET // max(1, len(self)))
+        for start in range(0, len(queries), step):
+            s = self.scores(queries[start:start + step])
+            idx = top_k(s, k)
+            positions[start:start + step] = idx
+            best[start:start + step] = np.take_along_axis(s, idx, axis=1)
+        return positions, best
+
+    def search(self, query, k=2):
+        """Top-k [(id, title, similarity)] for a single query vector."""
+        query = np.asarray(query, dtype=np.float32).ravel()
+        s = (self.vectors @ query) * self.inv_norms / (np.linalg.norm(query) + EPS)
+        results = []
+        for i in top_k(s, k):
+            title = self.titles[i] if self.titles is not None else None
+            results.append((self.ids[i].item(), title, float(s[i])))
+        return results